@@ -1,12 +1,16 @@
 """
 Database Configuration
-SQLAlchemy setup for PostgreSQL
+SQLAlchemy setup for PostgreSQL, with optional read replicas
 """
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+import itertools
 import os
+import threading
+import time
 
 # Database URL
 DATABASE_URL = os.getenv(
@@ -14,11 +18,146 @@ DATABASE_URL = os.getenv(
     "postgresql://flightuser:flightpass@db:5432/flightdb"
 )
 
+# Comma-separated read replica URLs (empty: all reads go to the primary)
+DATABASE_REPLICA_URLS = [
+    url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+]
+
+# Seconds a failed replica is skipped before it is tried again
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+
+# Minimum seconds between health probes of the primary and replicas (/health serves the cached result)
+HEALTH_CHECK_INTERVAL_SECONDS = float(os.getenv("HEALTH_CHECK_INTERVAL_SECONDS", "10"))
+
+# Connection pool sizing (also bounds admission control in main.py)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+
 # Create engine
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW)
 
 # Create SessionLocal
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Create Base
 Base = declarative_base()
+
+
+# ==================== READ REPLICAS ====================
+
+class Replica:
+    """A read replica engine with its health state"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.engine = create_engine(
+            url,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_pre_ping=True
+        )
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.down_until = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.down_until
+
+    def mark_down(self):
+        self.down_until = time.monotonic() + REPLICA_RETRY_SECONDS
+        self.engine.dispose()
+
+
+class ReplicaSet:
+    """Round-robins read sessions over healthy replicas, failing over to the primary"""
+
+    def __init__(self, urls: list):
+        self.replicas = [Replica(url) for url in urls]
+        self._cycle = itertools.cycle(self.replicas)
+        self._lock = threading.Lock()
+
+    @property
+    def engines(self) -> list:
+        return [replica.engine for replica in self.replicas]
+
+    def _candidates(self) -> list:
+        with self._lock:
+            ordered = [next(self._cycle) for _ in self.replicas]
+        return [replica for replica in ordered if replica.healthy]
+
+    def session(self):
+        """Open a session on the next healthy replica, or on the primary if none respond"""
+        for replica in self._candidates():
+            db = replica.session_factory()
+            try:
+                db.connection()
+                return db
+            except DBAPIError:
+                db.close()
+                replica.mark_down()
+        return SessionLocal()
+
+    def status(self) -> list:
+        return [
+            {"url": replica.engine.url.render_as_string(hide_password=True), "healthy": replica.healthy}
+            for replica in self.replicas
+        ]
+
+    def check(self):
+        """Probe every replica, marking unreachable ones down"""
+        for replica in self.replicas:
+            try:
+                with replica.engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+                replica.down_until = 0.0
+            except DBAPIError:
+                replica.mark_down()
+
+
+replicas = ReplicaSet(DATABASE_REPLICA_URLS)
+
+
+# ==================== HEALTH ====================
+
+class HealthMonitor:
+    """
+    Probes the primary and every replica at most once per interval. Only one
+    caller probes at a time; everyone else gets the cached result, so frequent
+    health polling never turns into a connection per replica per request.
+    """
+
+    def __init__(self, interval: float = HEALTH_CHECK_INTERVAL_SECONDS):
+        self.interval = interval
+        self.primary_ok = None
+        self.checked_at = None
+        self._lock = threading.Lock()
+
+    def probe(self):
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            self.primary_ok = True
+        except DBAPIError:
+            self.primary_ok = False
+        replicas.check()
+        self.checked_at = time.monotonic()
+
+    def status(self) -> dict:
+        stale = self.checked_at is None or time.monotonic() - self.checked_at >= self.interval
+        if stale and self._lock.acquire(blocking=False):
+            try:
+                self.probe()
+            finally:
+                self._lock.release()
+        if self.primary_ok is None:
+            database = "unknown"
+        else:
+            database = "connected" if self.primary_ok else "unavailable"
+        return {
+            "database": database,
+            "replicas": replicas.status(),
+            "checked_seconds_ago": round(time.monotonic() - self.checked_at, 1) if self.checked_at else None,
+        }
+
+
+health = HealthMonitor()
@@ -0,0 +1,180 @@
+"""
+Inventory Change Feed
+In-process pub/sub (optionally fanned out via PostgreSQL LISTEN/NOTIFY) for seat and status changes
+"""
+
+from datetime import datetime
+import asyncio
+import json
+import logging
+import os
+import select
+import threading
+import time
+
+from sqlalchemy import text
+
+from . import database
+
+logger = logging.getLogger("flight_api.events")
+
+EVENTS_BACKEND = os.getenv("EVENTS_BACKEND", "memory")  # memory, postgres
+EVENTS_COALESCE_SECONDS = float(os.getenv("EVENTS_COALESCE_SECONDS", "1.0"))
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+NOTIFY_CHANNEL = "inventory_changes"
+
+
+def flight_event(flight) -> dict:
+    """Build an inventory-change event from a Flight (call before commit expires it)"""
+    return {
+        "type": "inventory",
+        "flight_id": flight.id,
+        "origin": flight.origin,
+        "destination": flight.destination,
+        "departure_date": flight.departure_date.isoformat(),
+        "available_seats": flight.available_seats,
+        "status": flight.status,
+        "timestamp": datetime.utcnow().isoformat(),
+    }
+
+
+class Subscription:
+    """
+    Events for a set of flights or a route (optionally a single date).
+    Bursts are coalesced: at most one batch per interval, holding the latest
+    event per flight.
+    """
+
+    def __init__(self, flight_ids=None, origin=None, destination=None, departure_date=None,
+                 interval: float = EVENTS_COALESCE_SECONDS):
+        if not flight_ids and not (origin and destination):
+            raise ValueError("Subscribe by flight_id or by origin and destination")
+        self.flight_ids = set(flight_ids or [])
+        self.origin = origin.upper() if origin else None
+        self.destination = destination.upper() if destination else None
+        self.departure_date = departure_date.isoformat() if departure_date else None
+        self.interval = interval
+        self.pending = {}
+        self.ready = asyncio.Event()
+        self.last_flush = 0.0
+
+    def matches(self, event: dict) -> bool:
+        if self.flight_ids:
+            return event["flight_id"] in self.flight_ids
+        return (
+            event["origin"] == self.origin
+            and event["destination"] == self.destination
+            and (self.departure_date is None or event["departure_date"] == self.departure_date)
+        )
+
+    def offer(self, event: dict):
+        self.pending[event["flight_id"]] = event
+        self.ready.set()
+
+    async def next_batch(self, timeout: float = EVENTS_HEARTBEAT_SECONDS) -> list:
+        """Wait for the next coalesced batch; returns [] if nothing arrived within timeout"""
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        loop = asyncio.get_running_loop()
+        delay = self.interval - (loop.time() - self.last_flush)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        batch = list(self.pending.values())
+        self.pending.clear()
+        self.ready.clear()
+        self.last_flush = loop.time()
+        return batch
+
+
+# ==================== BROKERS ====================
+
+class InProcessBroker:
+    """Fans events out to subscribers in this process. publish() is thread-safe."""
+
+    def __init__(self):
+        self.subscriptions = set()
+        self.loop = None
+
+    def subscribe(self, **filters) -> Subscription:
+        self.loop = asyncio.get_running_loop()
+        subscription = Subscription(**filters)
+        self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscriptions.discard(subscription)
+
+    def publish(self, event: dict):
+        self._deliver(event)
+
+    def _deliver(self, event: dict):
+        if self.loop is None or not self.subscriptions:
+            return
+        self.loop.call_soon_threadsafe(self._dispatch, event)
+
+    def _dispatch(self, event: dict):
+        for subscription in list(self.subscriptions):
+            if subscription.matches(event):
+                subscription.offer(event)
+
+
+class PostgresBroker(InProcessBroker):
+    """Publishes with NOTIFY so subscribers on every worker see every change"""
+
+    def __init__(self, engine):
+        super().__init__()
+        self.engine = engine
+        self._listener = None
+
+    def publish(self, event: dict):
+        # Called after the change is committed; a lost notification must not fail the request
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(text("SELECT pg_notify(:channel, :payload)"),
+                             {"channel": NOTIFY_CHANNEL, "payload": json.dumps(event)})
+        except Exception:
+            logger.exception("Failed to publish inventory event for flight %s", event["flight_id"])
+
+    def subscribe(self, **filters) -> Subscription:
+        if self._listener is None:
+            self._listener = threading.Thread(target=self._listen, name="inventory-listener", daemon=True)
+            self._listener.start()
+        return super().subscribe(**filters)
+
+    def _listen(self):
+        while True:
+            raw = None
+            try:
+                raw = self.engine.raw_connection()
+                conn = raw.driver_connection
+                conn.autocommit = True
+                conn.cursor().execute(f"LISTEN {NOTIFY_CHANNEL}")
+                while True:
+                    if select.select([conn], [], [], 5) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self._deliver(json.loads(conn.notifies.pop(0).payload))
+            except Exception:
+                logger.exception("Inventory listener failed, reconnecting")
+                time.sleep(1)
+            finally:
+                # LISTEN state must not leak back into the pool
+                if raw is not None:
+                    raw.invalidate()
+
+
+def create_broker():
+    if EVENTS_BACKEND == "postgres":
+        if database.engine.dialect.name != "postgresql":
+            raise RuntimeError(
+                "EVENTS_BACKEND=postgres (the default under gunicorn) needs a PostgreSQL DATABASE_URL; "
+                "set EVENTS_BACKEND=memory to accept per-worker event feeds"
+            )
+        return PostgresBroker(database.engine)
+    return InProcessBroker()
+
+
+broker = create_broker()
@@ -0,0 +1,250 @@
+"""
+Background Jobs
+Scheduled flight status transitions, booking housekeeping and bulk flight cancellation
+"""
+
+from datetime import datetime, timedelta, timezone
+import asyncio
+import logging
+import os
+import time
+
+from sqlalchemy import and_, case, or_, select, update
+from sqlalchemy.orm import Session
+
+from . import models, database, events, shared_state
+
+logger = logging.getLogger("flight_api.jobs")
+
+JOBS_ENABLED = os.getenv("JOBS_ENABLED", "true").lower() == "true"
+JOB_INTERVAL_SECONDS = float(os.getenv("JOB_INTERVAL_SECONDS", "60"))
+JOB_BATCH_SIZE = int(os.getenv("JOB_BATCH_SIZE", "1000"))
+BOARDING_MINUTES = int(os.getenv("BOARDING_MINUTES", "30"))
+
+# Flight dates and times are local airport times (Nigeria: WAT, UTC+1, no DST)
+FLIGHT_TIMEZONE = timezone(timedelta(hours=float(os.getenv("FLIGHT_UTC_OFFSET_HOURS", "1"))))
+
+
+def local_now() -> datetime:
+    return datetime.now(FLIGHT_TIMEZONE).replace(tzinfo=None)
+
+
+def _at_or_before(date_column, time_column, moment: datetime):
+    """SQL condition: (date_column, time_column) <= moment"""
+    return or_(
+        date_column < moment.date(),
+        and_(date_column == moment.date(), time_column <= moment.time())
+    )
+
+
+def _transition_in_batches(db: Session, condition, new_status: str, batch_size: int) -> int:
+    """Move matching flights to new_status, committing and publishing one batch at a time"""
+    flight = models.Flight
+    total = 0
+    while True:
+        batch = db.execute(
+            select(flight.id, flight.origin, flight.destination, flight.departure_date,
+                   flight.available_seats, flight.status)
+            .where(condition)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            return total
+
+        db.execute(
+            update(flight)
+            .where(flight.id.in_([row.id for row in batch]))
+            .values(status=new_status, updated_at=datetime.utcnow()),
+            execution_options={"synchronize_session": False}
+        )
+        db.commit()
+        total += len(batch)
+
+        for row in batch:
+            events.broker.publish({**events.flight_event(row), "status": new_status})
+
+
+# ==================== JOBS ====================
+
+def advance_flight_statuses(db: Session, now: datetime = None, batch_size: int = JOB_BATCH_SIZE) -> dict:
+    """scheduled -> boarding -> departed -> arrived, based on departure and arrival times"""
+    now = now or local_now()
+    flight = models.Flight
+    departed = _at_or_before(flight.departure_date, flight.departure_time, now)
+    arrived = _at_or_before(flight.arrival_date, flight.arrival_time, now)
+    boarding = _at_or_before(flight.departure_date, flight.departure_time, now + timedelta(minutes=BOARDING_MINUTES))
+
+    # Latest state first, so flights that were missed entirely jump straight to it
+    return {
+        "arrived": _transition_in_batches(
+            db, and_(flight.status.in_(["scheduled", "boarding", "departed"]), arrived), "arrived", batch_size
+        ),
+        "departed": _transition_in_batches(
+            db, and_(flight.status.in_(["scheduled", "boarding"]), departed), "departed", batch_size
+        ),
+        "boarding": _transition_in_batches(
+            db, and_(flight.status == "scheduled", boarding), "boarding", batch_size
+        ),
+    }
+
+
+def complete_bookings(db: Session, now: datetime = None) -> dict:
+    """Mark confirmed bookings on arrived flights as completed"""
+    arrived_flights = select(models.Flight.id).where(models.Flight.status == "arrived")
+    result = db.execute(
+        update(models.Booking)
+        .where(models.Booking.booking_status == "confirmed", models.Booking.flight_id.in_(arrived_flights))
+        .values(booking_status="completed", updated_at=datetime.utcnow()),
+        execution_options={"synchronize_session": False}
+    )
+    db.commit()
+    return {"bookings_completed": result.rowcount}
+
+
+def cancel_flight(db: Session, flight_id: int) -> dict:
+    """
+    Cancel a flight and, in the same transaction, cancel its open bookings and
+    refund their completed payments with set-based UPDATEs.
+    """
+    open_bookings = select(models.Booking.id).where(
+        models.Booking.flight_id == flight_id,
+        models.Booking.booking_status != "cancelled"
+    )
+    options = {"synchronize_session": False}
+    now = datetime.utcnow()
+
+    payments = db.execute(
+        update(models.Payment)
+        .where(models.Payment.booking_id.in_(open_bookings), models.Payment.payment_status == "completed")
+        .values(payment_status="refunded"),
+        execution_options=options
+    )
+    bookings = db.execute(
+        update(models.Booking)
+        .where(models.Booking.flight_id == flight_id, models.Booking.booking_status != "cancelled")
+        .values(
+            booking_status="cancelled",
+            payment_status=case(
+                (models.Booking.payment_status == "completed", "refunded"),
+                else_=models.Booking.payment_status
+            ),
+            updated_at=now
+        ),
+        execution_options=options
+    )
+    flights = db.execute(
+        update(models.Flight)
+        .where(models.Flight.id == flight_id, models.Flight.status != "cancelled")
+        .values(status="cancelled", updated_at=now),
+        execution_options=options
+    )
+    db.commit()
+
+    flight = db.get(models.Flight, flight_id)
+    if flight is not None:
+        events.broker.publish(events.flight_event(flight))
+    return {
+        "flights_cancelled": flights.rowcount,
+        "bookings_cancelled": bookings.rowcount,
+        "payments_refunded": payments.rowcount,
+    }
+
+
+# ==================== RUNNER ====================
+
+def run_job(name: str, func, db: Session, **kwargs) -> dict:
+    """Run func(db, **kwargs) and report its duration and row counts"""
+    started_at = datetime.utcnow()
+    started = time.perf_counter()
+    try:
+        rows = func(db, **kwargs)
+    except Exception:
+        db.rollback()
+        logger.exception("Job %s failed", name)
+        raise
+    report = {
+        "job": name,
+        "started_at": started_at,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+        "rows": rows,
+    }
+    logger.info("Job %s finished in %.1fms: %s", name, report["duration_ms"], rows)
+    return report
+
+
+class Job:
+    def __init__(self, name: str, func, interval: float):
+        self.name = name
+        self.func = func
+        self.interval = interval
+
+
+class JobRunner:
+    """
+    Runs registered jobs on fixed intervals in the app's event loop (work happens
+    in threads). Each interval is claimed through a shared state lease, so with a
+    shared backend every job runs once per interval across all workers, and the
+    latest reports are kept in shared state where any worker can read them.
+    """
+
+    REPORT_KEY = "jobs:report:{}"
+
+    def __init__(self):
+        self.jobs = {}
+        self._tasks = []
+
+    def register(self, name: str, func, interval: float = JOB_INTERVAL_SECONDS):
+        self.jobs[name] = Job(name, func, interval)
+
+    def run(self, name: str) -> dict:
+        """Run a job once, synchronously, and record its report"""
+        db = database.SessionLocal()
+        try:
+            report = run_job(name, self.jobs[name].func, db)
+        finally:
+            db.close()
+        try:
+            shared_state.store.set(
+                self.REPORT_KEY.format(name), {**report, "started_at": report["started_at"].isoformat()}
+            )
+        except Exception:
+            logger.exception("Could not store the report of job %s", name)
+        return report
+
+    def reports(self) -> list:
+        """Latest report of each job that has run, from whichever worker ran it (may block)"""
+        stored = (shared_state.store.get(self.REPORT_KEY.format(name)) for name in self.jobs)
+        return [report for report in stored if report is not None]
+
+    async def _loop(self, job: Job):
+        while True:
+            # With several workers sharing state, only the one holding the lease runs the job
+            lease = (f"jobs:lease:{job.name}", os.getpid(), job.interval)
+            try:
+                if shared_state.store.blocking:
+                    acquired = await asyncio.to_thread(shared_state.store.add, *lease)
+                else:
+                    acquired = shared_state.store.add(*lease)
+            except Exception:
+                logger.exception("Could not claim the lease for job %s", job.name)
+                acquired = False
+            if acquired:
+                try:
+                    await asyncio.to_thread(self.run, job.name)
+                except Exception:
+                    pass  # already logged; try again next interval
+            await asyncio.sleep(job.interval)
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._loop(job)) for job in self.jobs.values()]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+runner = JobRunner()
+runner.register("advance_flight_statuses", advance_flight_statuses)
+runner.register("complete_bookings", complete_bookings)
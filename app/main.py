@@ -3,22 +3,36 @@ Flight Booking API - Main Application
 Complete flight reservation system with search, booking, and payment processing
 """
 
-from fastapi import FastAPI, Depends, HTTPException, status, Query
+from fastapi import FastAPI, Depends, HTTPException, status, Query, Request, WebSocket
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from datetime import datetime, timedelta, date
+from datetime import datetime, timedelta, date, time
 import jwt
 from passlib.context import CryptContext
 from decimal import Decimal
+import asyncio
+import json
+import logging
+import os
 
-from . import models, schemas, database
+from . import models, schemas, database, profiling, ratelimit, events, jobs, responses, shared_state, snapshot
+
+logger = logging.getLogger("flight_api")
 
 # Configuration
 SECRET_KEY = "your-secret-key-change-in-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Names nobody can register (admins are granted with manage_users.py, never by name)
+RESERVED_USERNAMES = {"admin", "administrator", "root", "superuser", "system", "support"}
+MAX_IN_FLIGHT_REQUESTS = int(os.getenv(
+    "MAX_IN_FLIGHT_REQUESTS",
+    str(database.DB_POOL_SIZE + database.DB_MAX_OVERFLOW)
+))
+AIRPORTS_CACHE_SECONDS = int(os.getenv("AIRPORTS_CACHE_SECONDS", "3600"))
 
 # Security
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -33,17 +47,62 @@ app = FastAPI(
     redoc_url="/api/redoc"
 )
 
-# CORS
+# Profiling (inactive until enabled via PROFILING_ENABLED or the admin API)
+app.middleware("http")(profiling.endpoint_context_middleware)
+for engine in [database.engine] + database.replicas.engines:
+    profiling.install_query_hooks(engine)
+
+# Admission control and per-client rate limiting (rate limiter runs first)
+app.middleware("http")(ratelimit.AdmissionController(max_in_flight=MAX_IN_FLIGHT_REQUESTS))
+app.middleware("http")(ratelimit.RateLimiter(secret_key=SECRET_KEY, algorithm=ALGORITHM))
+
+# Cache-Control on read endpoints, then negotiated gzip/brotli compression (outermost)
+app.add_middleware(responses.CacheControlMiddleware)
+app.add_middleware(responses.CompressionMiddleware)
+
+# CORS (registered last so it is outermost: 429/503 responses carry CORS headers too)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
 
-# Create tables
-models.Base.metadata.create_all(bind=database.engine)
+# Create tables. Under gunicorn this runs once in the master before workers start
+# (gunicorn.conf.py), so workers don't race each other on DDL.
+if os.getenv("CREATE_SCHEMA_ON_STARTUP", "true").lower() == "true":
+    models.create_schema(database.engine)
+
+# Several workers need backends that share events and state between them
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", "1"))
+if WEB_WORKERS > 1:
+    if events.EVENTS_BACKEND == "memory":
+        logger.warning("EVENTS_BACKEND=memory with %d workers: subscribers only see their own worker's events", WEB_WORKERS)
+    if shared_state.store.name in shared_state.PER_PROCESS_BACKENDS:
+        logger.warning(
+            "SHARED_STATE_BACKEND=%s with %d workers: caches and limits are per worker",
+            shared_state.store.name, WEB_WORKERS
+        )
+
+# Flight search sorting and projection
+FLIGHT_SORT_COLUMNS = {
+    "price": models.Flight.price,
+    "departure_time": models.Flight.departure_time,
+    "duration": models.Flight.duration_minutes,
+}
+FLIGHT_SEARCH_FIELDS = list(schemas.FlightSearchResult.model_fields)
+
+
+@app.on_event("startup")
+async def start_background_jobs():
+    if jobs.JOBS_ENABLED:
+        jobs.runner.start()
+
+@app.on_event("shutdown")
+async def stop_background_jobs():
+    await jobs.runner.stop()
 
 
 # ==================== UTILITY FUNCTIONS ====================
@@ -67,6 +126,14 @@ def get_db():
     finally:
         db.close()
 
+def get_read_db():
+    """Session for read-only endpoints; served by a read replica when configured"""
+    db = database.replicas.session()
+    try:
+        yield db
+    finally:
+        db.close()
+
 async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -86,12 +153,20 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         raise credentials_exception
     return user
 
+def get_admin_user(current_user: models.User = Depends(get_current_user)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    return current_user
+
 
 # ==================== AUTHENTICATION ====================
 
 @app.post("/api/auth/register", response_model=schemas.UserResponse, tags=["Authentication"])
 def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     """Register a new user"""
+    if user.username.lower() in RESERVED_USERNAMES:
+        raise HTTPException(status_code=400, detail="Username is reserved")
+    
     db_user = db.query(models.User).filter(models.User.username == user.username).first()
     if db_user:
         raise HTTPException(status_code=400, detail="Username already registered")
@@ -135,7 +210,13 @@ def get_current_user_info(current_user: models.User = Depends(get_current_user))
 
 # ==================== FLIGHTS ====================
 
-@app.get("/api/flights/search", response_model=List[schemas.FlightResponse], tags=["Flights"])
+@app.get(
+    "/api/flights/search",
+    response_model=List[schemas.FlightSearchResult],
+    response_model_exclude_unset=True,
+    tags=["Flights"]
+)
+@profiling.profile_endpoint
 def search_flights(
     origin: str = Query(..., description="Origin airport code (e.g., LOS)"),
     destination: str = Query(..., description="Destination airport code (e.g., ABV)"),
@@ -143,10 +224,42 @@ def search_flights(
     return_date: Optional[date] = Query(None, description="Return date for round trip"),
     passengers: int = Query(1, ge=1, le=9),
     class_type: Optional[str] = Query(None, description="economy, business, or first"),
-    db: Session = Depends(get_db)
+    airline_id: Optional[int] = Query(None, description="Only flights operated by this airline"),
+    departure_after: Optional[time] = Query(None, description="Earliest departure time (HH:MM)"),
+    departure_before: Optional[time] = Query(None, description="Latest departure time (HH:MM)"),
+    max_price: Optional[Decimal] = Query(None, ge=0),
+    max_duration: Optional[int] = Query(None, ge=1, description="Maximum duration in minutes"),
+    sort_by: Optional[str] = Query(None, pattern="^(price|departure_time|duration)$"),
+    sort_order: str = Query("asc", pattern="^(asc|desc)$"),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (e.g., id,price,departure_time)"),
+    db: Session = Depends(get_read_db)
 ):
     """Search for available flights"""
-    query = db.query(models.Flight).filter(
+    requested = None
+    if fields:
+        requested = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = requested - set(FLIGHT_SEARCH_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    if snapshot.SNAPSHOT_ENABLED:
+        flights = search_snapshot(
+            db, origin, destination, departure_date, passengers, class_type, airline_id,
+            departure_after, departure_before, max_price, max_duration, sort_by, sort_order, limit, requested
+        )
+        if not flights:
+            raise HTTPException(status_code=404, detail="No flights found for the selected criteria")
+        return flights
+
+    if fields:
+        # Select only the requested columns (id is always included)
+        columns = [getattr(models.Flight, name) for name in FLIGHT_SEARCH_FIELDS if name == "id" or name in requested]
+        query = db.query(*columns)
+    else:
+        query = db.query(models.Flight)
+
+    query = query.filter(
         models.Flight.origin == origin.upper(),
         models.Flight.destination == destination.upper(),
         models.Flight.departure_date == departure_date,
@@ -155,16 +268,56 @@ def search_flights(
     
     if class_type:
         query = query.filter(models.Flight.class_type == class_type)
+    if airline_id is not None:
+        query = query.filter(models.Flight.airline_id == airline_id)
+    if departure_after is not None:
+        query = query.filter(models.Flight.departure_time >= departure_after)
+    if departure_before is not None:
+        query = query.filter(models.Flight.departure_time <= departure_before)
+    if max_price is not None:
+        query = query.filter(models.Flight.price <= max_price)
+    if max_duration is not None:
+        query = query.filter(models.Flight.duration_minutes <= max_duration)
+
+    if sort_by:
+        column = FLIGHT_SORT_COLUMNS[sort_by]
+        query = query.order_by(column.desc() if sort_order == "desc" else column.asc(), models.Flight.id)
+    if limit:
+        query = query.limit(limit)
     
     flights = query.all()
     
     if not flights:
         raise HTTPException(status_code=404, detail="No flights found for the selected criteria")
     
+    if fields:
+        return [row._asdict() for row in flights]
     return flights
 
+def search_snapshot(db, origin, destination, departure_date, passengers, class_type, airline_id,
+                    departure_after, departure_before, max_price, max_duration, sort_by, sort_order, limit,
+                    requested) -> list:
+    """search_flights served from the in-process flight snapshot (same filters, order and projection)"""
+    catalogue = snapshot.catalogue.get(db)
+    rows = [
+        catalogue.row(i) for i in catalogue.search(
+            origin, destination, departure_date, passengers=passengers, class_type=class_type,
+            airline_id=airline_id, departure_after=departure_after, departure_before=departure_before,
+            max_price=max_price, max_duration=max_duration
+        )
+    ]
+    if sort_by:
+        field = FLIGHT_SORT_COLUMNS[sort_by].key
+        rows.sort(key=lambda row: row["id"])
+        rows.sort(key=lambda row: row[field], reverse=sort_order == "desc")
+    if limit:
+        rows = rows[:limit]
+    if requested:
+        rows = [{name: row[name] for name in FLIGHT_SEARCH_FIELDS if name == "id" or name in requested} for row in rows]
+    return rows
+
 @app.get("/api/flights/{flight_id}", response_model=schemas.FlightResponse, tags=["Flights"])
-def get_flight(flight_id: int, db: Session = Depends(get_db)):
+def get_flight(flight_id: int, db: Session = Depends(get_read_db)):
     """Get flight details by ID"""
     flight = db.query(models.Flight).filter(models.Flight.id == flight_id).first()
     if not flight:
@@ -175,7 +328,7 @@ def get_flight(flight_id: int, db: Session = Depends(get_db)):
 def get_all_flights(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get all available flights"""
     flights = db.query(models.Flight).offset(skip).limit(limit).all()
@@ -185,6 +338,7 @@ def get_all_flights(
 # ==================== BOOKINGS ====================
 
 @app.post("/api/bookings", response_model=schemas.BookingResponse, status_code=status.HTTP_201_CREATED, tags=["Bookings"])
+@profiling.profile_endpoint
 def create_booking(
     booking: schemas.BookingCreate,
     current_user: models.User = Depends(get_current_user),
@@ -225,8 +379,10 @@ def create_booking(
     
     # Update available seats
     flight.available_seats -= total_passengers
+    inventory_event = events.flight_event(flight)
     
     db.commit()
+    events.broker.publish(inventory_event)
     db.refresh(new_booking)
     return new_booking
 
@@ -278,9 +434,11 @@ def cancel_booking(
     # Restore seats
     flight = db.query(models.Flight).filter(models.Flight.id == booking.flight_id).first()
     flight.available_seats += booking.total_passengers
+    inventory_event = events.flight_event(flight)
     
     booking.booking_status = "cancelled"
     db.commit()
+    events.broker.publish(inventory_event)
     db.refresh(booking)
     return booking
 
@@ -326,9 +484,16 @@ def process_payment(
 # ==================== AIRPORTS ====================
 
 @app.get("/api/airports", response_model=List[schemas.AirportResponse], tags=["Airports"])
-def get_airports(db: Session = Depends(get_db)):
+def get_airports(db: Session = Depends(get_read_db)):
     """Get all available airports"""
-    airports = db.query(models.Airport).all()
+    # Cached in shared state so every worker serves the same list without a query
+    airports = shared_state.store.get("cache:airports")
+    if airports is None:
+        airports = [
+            schemas.AirportResponse.model_validate(airport).model_dump(mode="json")
+            for airport in db.query(models.Airport).all()
+        ]
+        shared_state.store.set("cache:airports", airports, ttl=AIRPORTS_CACHE_SECONDS)
     return airports
 
 
@@ -362,6 +527,142 @@ def get_booking_statistics(
     }
 
 
+# ==================== INVENTORY EVENTS ====================
+
+def _inventory_subscription(flight_id, origin, destination, departure_date):
+    try:
+        return events.broker.subscribe(
+            flight_ids=flight_id, origin=origin, destination=destination, departure_date=departure_date
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/events/flights", tags=["Events"])
+async def stream_inventory_events(
+    request: Request,
+    flight_id: Optional[List[int]] = Query(None, description="Flight ids to watch (repeatable)"),
+    origin: Optional[str] = Query(None, description="Watch a route instead of flight ids"),
+    destination: Optional[str] = Query(None),
+    departure_date: Optional[date] = Query(None, description="Limit a route subscription to one date")
+):
+    """Server-Sent Events stream of seat and status changes (one batch per coalescing interval)"""
+    subscription = _inventory_subscription(flight_id, origin, destination, departure_date)
+
+    async def event_stream():
+        try:
+            while not await request.is_disconnected():
+                batch = await subscription.next_batch()
+                if batch:
+                    yield f"event: inventory\ndata: {json.dumps(batch)}\n\n"
+                else:
+                    yield ": keepalive\n\n"
+        finally:
+            events.broker.unsubscribe(subscription)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.websocket("/api/events/ws")
+async def inventory_events_websocket(
+    websocket: WebSocket,
+    flight_id: Optional[List[int]] = Query(None),
+    origin: Optional[str] = Query(None),
+    destination: Optional[str] = Query(None),
+    departure_date: Optional[date] = Query(None)
+):
+    """WebSocket stream of seat and status changes"""
+    try:
+        subscription = _inventory_subscription(flight_id, origin, destination, departure_date)
+    except HTTPException as e:
+        await websocket.close(code=1008, reason=e.detail)
+        return
+
+    await websocket.accept()
+    # Client messages are ignored; watching for the disconnect ends the stream promptly
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(websocket))
+    try:
+        while True:
+            next_batch = asyncio.ensure_future(subscription.next_batch())
+            await asyncio.wait({next_batch, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected.done():
+                next_batch.cancel()
+                break
+            batch = next_batch.result()
+            await websocket.send_json(batch if batch else {"type": "heartbeat"})
+    finally:
+        disconnected.cancel()
+        events.broker.unsubscribe(subscription)
+
+async def _wait_for_disconnect(websocket: WebSocket):
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+
+# ==================== ADMIN ====================
+
+@app.put("/api/admin/flights/{flight_id}/status", response_model=schemas.FlightResponse, tags=["Admin"])
+def update_flight_status(
+    flight_id: int,
+    update: schemas.FlightStatusUpdate,
+    admin: models.User = Depends(get_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Update a flight's status (cancelling also cancels its bookings)"""
+    flight = db.query(models.Flight).filter(models.Flight.id == flight_id).first()
+    if not flight:
+        raise HTTPException(status_code=404, detail="Flight not found")
+    # Cancelling already cancelled and refunded the bookings, so the flight can't come back
+    if flight.status == "cancelled" and update.status != "cancelled":
+        raise HTTPException(status_code=400, detail="Flight is cancelled")
+
+    if update.status == "cancelled":
+        jobs.run_job("cancel_flight", jobs.cancel_flight, db, flight_id=flight_id)
+        db.refresh(flight)
+        return flight
+
+    flight.status = update.status
+    inventory_event = events.flight_event(flight)
+    db.commit()
+    events.broker.publish(inventory_event)
+    db.refresh(flight)
+    return flight
+
+@app.post("/api/admin/flights/{flight_id}/cancel", response_model=schemas.JobReport, tags=["Admin"])
+def cancel_flight(
+    flight_id: int,
+    admin: models.User = Depends(get_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Cancel a flight, cancelling its bookings and refunding completed payments in bulk"""
+    if not db.query(models.Flight.id).filter(models.Flight.id == flight_id).first():
+        raise HTTPException(status_code=404, detail="Flight not found")
+    return jobs.run_job("cancel_flight", jobs.cancel_flight, db, flight_id=flight_id)
+
+@app.get("/api/admin/jobs", response_model=List[schemas.JobReport], tags=["Admin"])
+def get_job_reports(admin: models.User = Depends(get_admin_user)):
+    """Latest report for each background job"""
+    return jobs.runner.reports()
+
+@app.post("/api/admin/jobs/{job_name}/run", response_model=schemas.JobReport, tags=["Admin"])
+def run_background_job(job_name: str, admin: models.User = Depends(get_admin_user)):
+    """Run a background job now"""
+    if job_name not in jobs.runner.jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return jobs.runner.run(job_name)
+
+@app.get("/api/admin/profiling", response_model=schemas.ProfilingSettings, tags=["Admin"])
+def get_profiling_settings(admin: models.User = Depends(get_admin_user)):
+    """Get current profiling settings"""
+    return profiling.refresh_settings(force=True)
+
+@app.put("/api/admin/profiling", response_model=schemas.ProfilingSettings, tags=["Admin"])
+def update_profiling_settings(
+    changes: schemas.ProfilingSettingsUpdate,
+    admin: models.User = Depends(get_admin_user)
+):
+    """Toggle slow-query logging and request profiling without a restart"""
+    return profiling.update_settings(changes)
+
+
 # ==================== HEALTH CHECK ====================
 
 @app.get("/", tags=["Health"])
@@ -376,9 +677,16 @@ def root():
 
 @app.get("/health", tags=["Health"])
 def health_check():
-    """Detailed health check"""
-    return {
-        "status": "healthy",
-        "database": "connected",
-        "timestamp": datetime.utcnow().isoformat()
-    }
+    """Detailed health check (database probes are throttled, see HEALTH_CHECK_INTERVAL_SECONDS)"""
+    health = database.health.status()
+    healthy = health["database"] == "connected"
+    return JSONResponse(
+        status_code=200 if healthy else 503,
+        content={
+            "status": "healthy" if healthy else "unhealthy",
+            **health,
+            "shared_state": shared_state.store.name,
+            "worker_pid": os.getpid(),
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    )
@@ -3,7 +3,7 @@ Database Models
 SQLAlchemy ORM models for Flight Booking System
 """
 
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, Date, Time, Numeric
+from sqlalchemy import inspect, text, Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, Date, Time, Numeric, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
@@ -20,6 +20,7 @@ class User(Base):
     phone_number = Column(String, nullable=True)
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
+    is_admin = Column(Boolean, default=False, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -81,6 +82,14 @@ class Flight(Base):
     airline = relationship("Airline", back_populates="flights")
     bookings = relationship("Booking", back_populates="flight")
 
+    # Route/date lookups, ordered by departure time or price within a day
+    __table_args__ = (
+        Index("ix_flights_route_date", "origin", "destination", "departure_date", "departure_time"),
+        Index("ix_flights_route_date_price", "origin", "destination", "departure_date", "price"),
+        # Natural key used by schedule imports
+        Index("uq_flights_schedule", "flight_number", "departure_date", "class_type", unique=True),
+    )
+
 
 class Booking(Base):
     """Booking model"""
@@ -138,3 +147,25 @@ class Payment(Base):
 
     # Relationships
     booking = relationship("Booking", back_populates="payments")
+
+
+# ==================== SCHEMA ====================
+
+# Columns added to existing tables since they were created: (table, column, DDL)
+ADDED_COLUMNS = [("users", "is_admin", "BOOLEAN NOT NULL DEFAULT FALSE")]
+
+
+def create_schema(engine):
+    """
+    Create missing tables, plus indexes and columns added to existing tables
+    since they were created. Unique indexes may need duplicates cleaned up
+    first, so they are left to schedule_import.
+    """
+    Base.metadata.create_all(bind=engine)
+    for index in Flight.__table__.indexes:
+        if not index.unique:
+            index.create(bind=engine, checkfirst=True)
+    for table, column, definition in ADDED_COLUMNS:
+        if column not in {c["name"] for c in inspect(engine).get_columns(table)}:
+            with engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {definition}"))
@@ -0,0 +1,267 @@
+"""
+Table Partitioning
+Monthly range partitions for flights and bookings on PostgreSQL, with archival of old months
+"""
+
+from datetime import date
+import gzip
+import os
+import re
+
+from sqlalchemy import text
+
+# Months of past partitions kept attached before archival
+FLIGHT_RETENTION_MONTHS = int(os.getenv("FLIGHT_RETENTION_MONTHS", "3"))
+BOOKING_RETENTION_MONTHS = int(os.getenv("BOOKING_RETENTION_MONTHS", "24"))
+
+PARTITIONED_TABLES = {
+    "flights": {
+        "column": "departure_date",
+        "retention_months": FLIGHT_RETENTION_MONTHS,
+        "indexes": {
+            "ix_flights_route_date": "(origin, destination, departure_date, departure_time)",
+            "ix_flights_route_date_price": "(origin, destination, departure_date, price)",
+            "ix_flights_flight_number": "(flight_number)",
+            "uq_flights_schedule": "(flight_number, departure_date, class_type)",
+        },
+        "foreign_keys": {
+            "flights_airline_id_fkey": "(airline_id) REFERENCES airlines (id)",
+        },
+        # A month is only archived once no attached row still points into it
+        "referenced_by": [("bookings", "flight_id")],
+    },
+    "bookings": {
+        "column": "created_at",
+        "retention_months": BOOKING_RETENTION_MONTHS,
+        "indexes": {
+            "ix_bookings_user_id": "(user_id)",
+            "ix_bookings_flight_id": "(flight_id)",
+            "ix_bookings_booking_reference": "(booking_reference)",
+        },
+        "foreign_keys": {
+            "bookings_user_id_fkey": "(user_id) REFERENCES users (id)",
+        },
+        # Unique indexes on a partitioned table must include the partition column
+        "dropped_constraints": ["UNIQUE (booking_reference), now a plain index"],
+        # Child rows archived and deleted together with their booking's month
+        "dependents": [("passengers", "booking_id"), ("payments", "booking_id")],
+    },
+}
+
+PARTITION_SUFFIX = re.compile(r"_(\d{4})_(\d{2})$")
+
+
+class PartitioningError(Exception):
+    """Raised when partition maintenance cannot run against the configured database"""
+
+
+# ==================== HELPERS ====================
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_of(value) -> date:
+    """First day of the month for a date or datetime"""
+    return date(value.year, value.month, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_{month:%Y_%m}"
+
+
+def require_postgres(engine):
+    if engine.dialect.name != "postgresql":
+        raise PartitioningError(f"Partitioning requires PostgreSQL, not {engine.dialect.name}")
+
+
+def is_partitioned(conn, table: str) -> bool:
+    return conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = :table"
+    ), {"table": table}).first() is not None
+
+
+def monthly_partitions(conn, table: str) -> dict:
+    """Map of month -> partition name for a partitioned table (default partition excluded)"""
+    rows = conn.execute(text(
+        "SELECT child.relname FROM pg_inherits i "
+        "JOIN pg_class parent ON parent.oid = i.inhparent "
+        "JOIN pg_class child ON child.oid = i.inhrelid "
+        "WHERE parent.relname = :table"
+    ), {"table": table})
+    partitions = {}
+    for (name,) in rows:
+        match = PARTITION_SUFFIX.search(name)
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+
+def create_partition(conn, table: str, month: date) -> str:
+    """
+    Create one monthly partition. Rows for that month already sitting in the
+    default partition (e.g. flights imported far ahead) are moved into it;
+    PostgreSQL refuses to create the partition while the default holds them.
+    """
+    name = partition_name(table, month)
+    column = PARTITIONED_TABLES[table]["column"]
+    start, end = month.isoformat(), add_months(month, 1).isoformat()
+    create = f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM ('{start}') TO ('{end}')"
+    default = f"{table}_default"
+    in_range = f"{column} >= '{start}' AND {column} < '{end}'"
+
+    has_default = conn.execute(text("SELECT to_regclass(:name)"), {"name": default}).scalar() is not None
+    if not has_default or conn.execute(text(f"SELECT 1 FROM {default} WHERE {in_range} LIMIT 1")).first() is None:
+        conn.execute(text(create))
+        return name
+
+    conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {default}"))
+    conn.execute(text(create))
+    conn.execute(text(f"INSERT INTO {table} SELECT * FROM {default} WHERE {in_range}"))
+    conn.execute(text(f"DELETE FROM {default} WHERE {in_range}"))
+    conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT"))
+    return name
+
+
+def create_partitions(conn, table: str, first_month: date, last_month: date) -> list:
+    """Create missing monthly partitions from first_month through last_month"""
+    existing = monthly_partitions(conn, table)
+    created = []
+    month = first_month
+    while month <= last_month:
+        if month not in existing:
+            created.append(create_partition(conn, table, month))
+        month = add_months(month, 1)
+    return created
+
+
+# ==================== CONVERSION ====================
+
+def convert_table(engine, table: str, months_ahead: int = 3) -> bool:
+    """
+    Rebuild an existing table as a range-partitioned table, copying its rows.
+
+    The primary key becomes (id, partition column), so foreign keys that point
+    at the table (bookings.flight_id, passengers/payments.booking_id) are dropped;
+    those relationships are enforced by the application from then on. Unique
+    constraints that don't include the partition column (see "dropped_constraints")
+    can't exist on a partitioned table and become plain indexes.
+    Returns False if the table is already partitioned.
+    """
+    require_postgres(engine)
+    spec = PARTITIONED_TABLES[table]
+    column = spec["column"]
+    legacy = f"{table}_unpartitioned"
+
+    with engine.begin() as conn:
+        if is_partitioned(conn, table):
+            return False
+
+        sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": table}).scalar()
+        bounds = conn.execute(text(f"SELECT min({column}), max({column}) FROM {table}")).first()
+
+        conn.execute(text(f"ALTER TABLE {table} RENAME TO {legacy}"))
+        conn.execute(text(
+            f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE ({column})"
+        ))
+        conn.execute(text(f"ALTER TABLE {table} ADD PRIMARY KEY (id, {column})"))
+        if sequence:
+            conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id"))
+
+        current = date.today().replace(day=1)
+        first = month_of(bounds[0]) if bounds[0] else current
+        last = max(month_of(bounds[1]), current) if bounds[1] else current
+        create_partitions(conn, table, min(first, current), add_months(last, months_ahead))
+        conn.execute(text(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT"))
+
+        conn.execute(text(f"INSERT INTO {table} SELECT * FROM {legacy}"))
+        conn.execute(text(f"DROP TABLE {legacy} CASCADE"))
+
+        for name, columns in spec["indexes"].items():
+            unique = "UNIQUE " if name.startswith("uq_") else ""
+            conn.execute(text(f"CREATE {unique}INDEX {name} ON {table} {columns}"))
+        for name, definition in spec["foreign_keys"].items():
+            conn.execute(text(f"ALTER TABLE {table} ADD CONSTRAINT {name} FOREIGN KEY {definition}"))
+    return True
+
+
+# ==================== MAINTENANCE ====================
+
+def ensure_future_partitions(engine, table: str, months_ahead: int = 3) -> list:
+    require_postgres(engine)
+    current = date.today().replace(day=1)
+    with engine.begin() as conn:
+        if not is_partitioned(conn, table):
+            raise PartitioningError(f"Table '{table}' is not partitioned; run the convert command first")
+        return create_partitions(conn, table, current, add_months(current, months_ahead))
+
+
+def _is_referenced(cursor, table: str, partition: str) -> bool:
+    """True if an attached row of a referencing table points into the partition"""
+    for referencing_table, column in PARTITIONED_TABLES[table].get("referenced_by", []):
+        cursor.execute(
+            f"SELECT 1 FROM {referencing_table} WHERE {column} IN (SELECT id FROM {partition}) LIMIT 1"
+        )
+        if cursor.fetchone() is not None:
+            return True
+    return False
+
+
+def _export(cursor, query: str, path: str):
+    with gzip.open(path, "wt") as archive:
+        cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH CSV HEADER", archive)
+
+
+def archive_partitions(engine, table: str, archive_dir: str, retention_months: int = None) -> tuple:
+    """
+    Detach partitions older than the retention window, write each to a gzipped
+    CSV in archive_dir and drop it. Rows of dependent tables (a booking's
+    passengers and payments) are written to their own CSVs next to it and
+    deleted, so no live row is left pointing at an archived booking. Each
+    partition is handled in its own transaction, so a failed export leaves it
+    and its dependents in place. Partitions still referenced by retained rows
+    (flights of bookings that are kept longer) stay attached.
+    Returns (archived paths, partitions kept because referenced).
+    """
+    require_postgres(engine)
+    if retention_months is None:
+        retention_months = PARTITIONED_TABLES[table]["retention_months"]
+    cutoff = add_months(date.today().replace(day=1), -retention_months)
+
+    with engine.connect() as conn:
+        partitions = monthly_partitions(conn, table)
+    expired = sorted(month for month in partitions if month < cutoff)
+
+    os.makedirs(archive_dir, exist_ok=True)
+    archived, referenced = [], []
+    for month in expired:
+        name = partitions[month]
+        paths = [os.path.join(archive_dir, f"{name}.csv.gz")]
+        raw = engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            if _is_referenced(cursor, table, name):
+                raw.rollback()
+                referenced.append(name)
+                continue
+            cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+            _export(cursor, f"SELECT * FROM {name}", paths[0])
+            for dependent, column in PARTITIONED_TABLES[table].get("dependents", []):
+                rows = f"FROM {dependent} WHERE {column} IN (SELECT id FROM {name})"
+                paths.append(os.path.join(archive_dir, f"{name}_{dependent}.csv.gz"))
+                _export(cursor, f"SELECT * {rows}", paths[-1])
+                cursor.execute(f"DELETE {rows}")
+            cursor.execute(f"DROP TABLE {name}")
+            raw.commit()
+        except Exception:
+            raw.rollback()
+            for path in paths:
+                if os.path.exists(path):
+                    os.remove(path)
+            raise
+        finally:
+            raw.close()
+        archived.extend(paths)
+    return archived, referenced
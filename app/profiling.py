@@ -0,0 +1,149 @@
+"""
+Profiling Hooks
+Opt-in slow-query logging and sampled CPU profiling of hot endpoints
+"""
+
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+import cProfile
+import logging
+import os
+import random
+import time
+
+from sqlalchemy import event
+
+from . import schemas, shared_state
+
+logger = logging.getLogger("flight_api.profiling")
+
+# Runtime settings (seeded from the environment, changeable via the admin API)
+settings = schemas.ProfilingSettings(
+    enabled=os.getenv("PROFILING_ENABLED", "false").lower() == "true",
+    slow_query_ms=float(os.getenv("PROFILING_SLOW_QUERY_MS", "100")),
+    slow_request_ms=float(os.getenv("PROFILING_SLOW_REQUEST_MS", "500")),
+    sample_rate=float(os.getenv("PROFILING_SAMPLE_RATE", "0.1")),
+    profile_dir=os.getenv("PROFILING_DIR", "/tmp/flight-api-profiles"),
+)
+
+# Settings changed through the admin API are stored in shared state so every worker picks them up
+SETTINGS_KEY = "profiling:settings"
+SETTINGS_REFRESH_SECONDS = float(os.getenv("PROFILING_SETTINGS_REFRESH_SECONDS", "2"))
+_refreshed_at = 0.0
+
+# Endpoint that issued the current SQL statement ("GET /api/flights/search")
+current_endpoint: ContextVar[str] = ContextVar("current_endpoint", default="-")
+
+
+def refresh_settings(force: bool = False) -> schemas.ProfilingSettings:
+    """
+    Copy settings stored by any worker into this one, at most every
+    SETTINGS_REFRESH_SECONDS. Called from threadpool code (endpoints, SQL hooks)
+    since the shared state lookup may block.
+    """
+    global _refreshed_at
+    now = time.monotonic()
+    if not force and now - _refreshed_at < SETTINGS_REFRESH_SECONDS:
+        return settings
+    _refreshed_at = now
+    try:
+        stored = shared_state.store.get(SETTINGS_KEY)
+    except Exception:
+        logger.exception("Could not read shared profiling settings")
+        return settings
+    if stored:
+        try:
+            _apply(schemas.ProfilingSettings.model_validate({**settings.model_dump(), **stored}))
+        except ValueError:
+            logger.exception("Ignoring invalid shared profiling settings")
+    return settings
+
+
+def _apply(validated: schemas.ProfilingSettings):
+    for field, value in validated.model_dump().items():
+        setattr(settings, field, value)
+
+
+def update_settings(changes: schemas.ProfilingSettingsUpdate) -> schemas.ProfilingSettings:
+    """Apply a partial settings update and share it with every worker"""
+    refresh_settings(force=True)
+    _apply(schemas.ProfilingSettings.model_validate(
+        {**settings.model_dump(), **changes.model_dump(exclude_unset=True)}
+    ))
+    shared_state.store.set(SETTINGS_KEY, settings.model_dump())
+    return settings
+
+
+# ==================== SLOW QUERY LOG ====================
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start_time"].pop()
+    refresh_settings()
+    if not settings.enabled:
+        return
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if elapsed_ms >= settings.slow_query_ms:
+        logger.warning(
+            "Slow query %.1fms [%s]: %s | params=%r",
+            elapsed_ms, current_endpoint.get(), statement, parameters
+        )
+
+
+def install_query_hooks(engine):
+    """Attach slow-query timing listeners to an engine"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ==================== REQUEST PROFILING ====================
+
+async def endpoint_context_middleware(request, call_next):
+    """Record which endpoint is running so SQL hooks can attribute queries"""
+    token = current_endpoint.set(f"{request.method} {request.url.path}")
+    try:
+        return await call_next(request)
+    finally:
+        current_endpoint.reset(token)
+
+
+def _save_profile(profiler: cProfile.Profile, name: str, elapsed_ms: float) -> str:
+    os.makedirs(settings.profile_dir, exist_ok=True)
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+    path = os.path.join(settings.profile_dir, f"{name}-{stamp}-{int(elapsed_ms)}ms.prof")
+    profiler.dump_stats(path)
+    return path
+
+
+def profile_endpoint(func):
+    """
+    Run a sampled fraction of calls under cProfile and keep the profile on disk
+    when the call exceeds the slow-request threshold. Profiles are standard
+    pstats files (open with `python -m pstats` or snakeviz).
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        refresh_settings()
+        if not settings.enabled or random.random() >= settings.sample_rate:
+            return func(*args, **kwargs)
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if elapsed_ms >= settings.slow_request_ms:
+                path = _save_profile(profiler, func.__name__, elapsed_ms)
+                logger.warning(
+                    "Slow request %.1fms [%s], profile saved to %s",
+                    elapsed_ms, current_endpoint.get(), path
+                )
+
+    return wrapper
@@ -0,0 +1,128 @@
+"""
+Rate Limiting and Admission Control
+Per-client token buckets with per-route budgets, plus a global in-flight cap
+"""
+
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+import math
+import os
+
+import jwt
+
+from . import shared_state
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+# Defaults to SHARED_STATE_BACKEND (memory, shm, redis, fakeredis)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "")
+
+# Paths that are never limited (health checks and docs); CORS preflights are never limited either
+EXEMPT_PATHS = {"/", "/health", "/api/docs", "/api/redoc", "/openapi.json"}
+
+# Long-lived streams hold no database connection, so they don't count towards admission
+STREAMING_PREFIX = "/api/events/"
+
+
+class Budget:
+    """Token bucket budget: `capacity` burst, refilled at `refill_rate` tokens/second"""
+
+    def __init__(self, name: str, capacity: float, refill_rate: float):
+        self.name = name
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+
+
+# (method, path prefix, budget); first match wins
+ROUTE_BUDGETS = [
+    ("GET", "/api/flights/search", Budget("search", capacity=20, refill_rate=5)),
+    ("POST", "/api/bookings", Budget("booking", capacity=5, refill_rate=0.5)),
+    ("POST", "/api/auth/token", Budget("login", capacity=5, refill_rate=0.2)),
+    ("POST", "/api/auth/register", Budget("register", capacity=3, refill_rate=0.05)),
+]
+DEFAULT_BUDGET = Budget("default", capacity=60, refill_rate=20)
+
+
+def budget_for(method: str, path: str) -> Budget:
+    for rule_method, prefix, budget in ROUTE_BUDGETS:
+        if method == rule_method and path.startswith(prefix):
+            return budget
+    return DEFAULT_BUDGET
+
+
+def create_backend():
+    """Rate limits use the shared state store unless RATE_LIMIT_BACKEND picks another backend"""
+    if RATE_LIMIT_BACKEND and RATE_LIMIT_BACKEND != shared_state.SHARED_STATE_BACKEND:
+        return shared_state.create_store(RATE_LIMIT_BACKEND)
+    return shared_state.store
+
+
+# ==================== MIDDLEWARE ====================
+
+class RateLimiter:
+    """HTTP middleware keying buckets by JWT subject, falling back to client IP"""
+
+    def __init__(self, secret_key: str, algorithm: str, backend=None, enabled: bool = RATE_LIMIT_ENABLED):
+        self.secret_key = secret_key
+        self.algorithm = algorithm
+        self.backend = backend or create_backend()
+        self.enabled = enabled
+
+    def client_identity(self, request) -> str:
+        authorization = request.headers.get("authorization", "")
+        if authorization.lower().startswith("bearer "):
+            try:
+                payload = jwt.decode(authorization[7:], self.secret_key, algorithms=[self.algorithm])
+                if payload.get("sub"):
+                    return f"user:{payload['sub']}"
+            except jwt.PyJWTError:
+                pass
+        host = request.client.host if request.client else "unknown"
+        return f"ip:{host}"
+
+    async def __call__(self, request, call_next):
+        if not self.enabled or request.method == "OPTIONS" or request.url.path in EXEMPT_PATHS:
+            return await call_next(request)
+
+        budget = budget_for(request.method, request.url.path)
+        key = f"ratelimit:{budget.name}:{self.client_identity(request)}"
+        if self.backend.blocking:
+            wait = await run_in_threadpool(self.backend.take, key, budget.capacity, budget.refill_rate)
+        else:
+            wait = self.backend.take(key, budget.capacity, budget.refill_rate)
+        if wait > 0:
+            return JSONResponse(
+                status_code=429,
+                content={"detail": "Rate limit exceeded"},
+                headers={"Retry-After": str(math.ceil(wait))}
+            )
+        return await call_next(request)
+
+
+class AdmissionController:
+    """
+    Sheds load with 503 once `max_in_flight` requests are already being served,
+    so excess traffic is rejected instead of queueing on the database pool.
+    The count is per process on purpose: each worker has its own pool.
+    """
+
+    def __init__(self, max_in_flight: int, retry_after: int = 1):
+        self.max_in_flight = max_in_flight
+        self.retry_after = retry_after
+        self.in_flight = 0
+
+    async def __call__(self, request, call_next):
+        if (request.method == "OPTIONS" or request.url.path in EXEMPT_PATHS
+                or request.url.path.startswith(STREAMING_PREFIX)):
+            return await call_next(request)
+
+        if self.in_flight >= self.max_in_flight:
+            return JSONResponse(
+                status_code=503,
+                content={"detail": "Server busy, please retry"},
+                headers={"Retry-After": str(self.retry_after)}
+            )
+        self.in_flight += 1
+        try:
+            return await call_next(request)
+        finally:
+            self.in_flight -= 1
@@ -0,0 +1,147 @@
+"""
+Response Optimisation
+Negotiated gzip/brotli compression and HTTP caching headers (pure ASGI middleware)
+"""
+
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+# (path prefix, Cache-Control) for successful GETs; first match wins
+CACHE_RULES = [
+    ("/api/airports", "public, max-age=3600"),
+    ("/api/flights/search", "public, max-age=30"),
+    ("/api/flights", "public, max-age=10"),
+    ("/api/bookings", "private, no-cache"),
+    ("/api/auth/me", "private, no-cache"),
+]
+
+
+def compress(body: bytes, encoding: str, level: int = None) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY if level is None else level)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL if level is None else level, mtime=0)
+
+
+def negotiate_encoding(accept_encoding: str) -> str:
+    """Pick br or gzip from an Accept-Encoding header, honouring q=0; None if neither"""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    wildcard = accepted.get("*", 0.0)
+    best = max(candidates, key=lambda name: accepted.get(name, wildcard))
+    return best if accepted.get(best, wildcard) > 0 else None
+
+
+def _add_vary(headers: list, value: bytes) -> list:
+    for i, (name, existing) in enumerate(headers):
+        if name == b"vary":
+            if value.lower() not in existing.lower():
+                headers[i] = (name, existing + b", " + value)
+            return headers
+    headers.append((b"vary", value))
+    return headers
+
+
+class CompressionMiddleware:
+    """
+    Compresses compressible responses of at least COMPRESSION_MIN_SIZE bytes.
+    Bodies are buffered until complete (inner BaseHTTPMiddleware layers send
+    them in chunks); event streams pass through untouched.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request_headers = dict(scope["headers"])
+        encoding = negotiate_encoding(request_headers.get(b"accept-encoding", b"").decode("latin-1"))
+        start_message = None
+        chunks = []
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                content_type = next((v for k, v in headers if k == b"content-type"), b"").decode("latin-1")
+                if content_type.startswith(COMPRESSIBLE_TYPES) and not content_type.startswith("text/event-stream"):
+                    start_message = {**message, "headers": _add_vary(headers, b"Accept-Encoding")}
+                    return
+                return await send(message)
+            if start_message is None or message["type"] != "http.response.body":
+                return await send(message)
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(chunks)
+            headers = start_message["headers"]
+            already_encoded = any(k == b"content-encoding" for k, _ in headers)
+            if encoding and not already_encoded and len(body) >= self.minimum_size:
+                body = compress(body, encoding)
+                headers = [(k, v) for k, v in headers if k != b"content-length"]
+                headers += [(b"content-encoding", encoding.encode()), (b"content-length", str(len(body)).encode())]
+
+            await send({**start_message, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class CacheControlMiddleware:
+    """Adds Cache-Control (per CACHE_RULES) to successful GET responses that don't set one"""
+
+    def __init__(self, app, rules: list = CACHE_RULES):
+        self.app = app
+        self.rules = rules
+
+    def _rule_for(self, path: str):
+        for prefix, value in self.rules:
+            if path.startswith(prefix):
+                return value.encode()
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            return await self.app(scope, receive, send)
+
+        cache_control = self._rule_for(scope["path"])
+        if cache_control is None:
+            return await self.app(scope, receive, send)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                headers = list(message.get("headers", []))
+                if not any(k == b"cache-control" for k, _ in headers):
+                    headers.append((b"cache-control", cache_control))
+                    if cache_control.startswith(b"private"):
+                        headers = _add_vary(headers, b"Authorization")
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
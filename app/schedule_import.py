@@ -0,0 +1,277 @@
+"""
+Schedule Import
+Streams airline schedule files (CSV/NDJSON) in chunks, diffs them against the
+flights table by (flight_number, departure_date, class_type) and upserts changes
+"""
+
+from datetime import datetime
+from itertools import islice
+from typing import List
+import csv
+import gzip
+import json
+import logging
+import time
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+
+logger = logging.getLogger("flight_api.schedule_import")
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# Schedule columns compared when diffing; available_seats is owned by bookings
+DIFF_COLUMNS = [
+    "airline_id", "origin", "destination", "departure_time", "arrival_date", "arrival_time",
+    "duration_minutes", "price", "total_seats", "aircraft_type",
+]
+
+KEY_COLUMNS = ["flight_number", "departure_date", "class_type"]
+
+row_adapter = TypeAdapter(List[schemas.ScheduleImportRow])
+
+
+class ScheduleImportError(Exception):
+    """Raised when a schedule cannot be imported"""
+
+
+# ==================== READING ====================
+
+def _open(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", newline="")
+    return open(path, newline="")
+
+
+def read_rows(path: str):
+    """
+    Yield raw row dicts from a .csv or .ndjson/.jsonl file (optionally gzipped).
+    An NDJSON line that isn't a JSON object yields None, so it is counted as invalid.
+    """
+    name = path[:-3] if path.endswith(".gz") else path
+    with _open(path) as f:
+        if name.endswith(".csv"):
+            for row in csv.DictReader(f):
+                # Empty CSV cells mean "not provided"
+                yield {key: value for key, value in row.items() if value != ""}
+        elif name.endswith((".ndjson", ".jsonl")):
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as e:
+                    logger.warning("Skipping malformed schedule line %d: %s", number, e)
+                    yield None
+                    continue
+                if not isinstance(row, dict):
+                    logger.warning("Skipping schedule line %d: expected a JSON object", number)
+                    row = None
+                yield row
+        else:
+            raise ScheduleImportError(f"Unsupported schedule format: {path}")
+
+
+def chunked(rows, size: int):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def validate_chunk(chunk: list) -> tuple:
+    """Validate a chunk in one pass; on failure, drop only the rows that were rejected"""
+    try:
+        return row_adapter.validate_python(chunk), 0
+    except ValidationError as e:
+        rejected = {error["loc"][0] for error in e.errors()}
+    for index in sorted(rejected):
+        logger.warning("Skipping invalid schedule row %s", chunk[index])
+    valid = [row for index, row in enumerate(chunk) if index not in rejected]
+    return row_adapter.validate_python(valid), len(rejected)
+
+
+# ==================== DIFF & UPSERT ====================
+
+def ensure_schedule_key(db: Session):
+    """Create the unique (flight_number, departure_date, class_type) index ON CONFLICT relies on"""
+    index = next(index for index in models.Flight.__table__.indexes if index.name == "uq_flights_schedule")
+    try:
+        index.create(bind=db.get_bind(), checkfirst=True)
+    except IntegrityError:
+        raise ScheduleImportError(
+            "flights has duplicate (flight_number, departure_date, class_type) rows; "
+            "remove them before importing schedules"
+        )
+
+
+def _to_record(row: schemas.ScheduleImportRow, airline_ids: dict, now: datetime) -> dict:
+    return {
+        "flight_number": row.flight_number,
+        "airline_id": airline_ids[row.airline_code.upper()],
+        "origin": row.origin.upper(),
+        "destination": row.destination.upper(),
+        "departure_date": row.departure_date,
+        "departure_time": row.departure_time,
+        "arrival_date": row.arrival_date,
+        "arrival_time": row.arrival_time,
+        "duration_minutes": row.duration_minutes,
+        "class_type": row.class_type,
+        "price": row.price,
+        "total_seats": row.total_seats if row.total_seats is not None else row.available_seats,
+        "available_seats": row.available_seats,
+        "aircraft_type": row.aircraft_type,
+        "status": "scheduled",
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def diff_records(db: Session, records: list) -> tuple:
+    """
+    Compare records with existing flights. Returns (new or changed records,
+    inserted count, unchanged count, oversold flights) where oversold flights
+    are updates cutting capacity below the seats already sold.
+    """
+    flight = models.Flight
+    key_columns = [getattr(flight, name) for name in KEY_COLUMNS]
+    keys = [tuple(record[name] for name in KEY_COLUMNS) for record in records]
+    existing = {
+        tuple(getattr(row, name) for name in KEY_COLUMNS): row
+        for row in db.execute(
+            select(*key_columns, flight.available_seats, *[getattr(flight, name) for name in DIFF_COLUMNS])
+            .where(tuple_(*key_columns).in_(keys))
+        )
+    }
+
+    changed, inserted, unchanged, oversold = [], 0, 0, []
+    for key, record in zip(keys, records):
+        current = existing.get(key)
+        if current is None:
+            inserted += 1
+            changed.append(record)
+        elif any(getattr(current, name) != record[name] for name in DIFF_COLUMNS):
+            changed.append(record)
+            sold = current.total_seats - current.available_seats
+            if record["total_seats"] < sold:
+                oversold.append({
+                    "flight_number": record["flight_number"],
+                    "departure_date": record["departure_date"],
+                    "class_type": record["class_type"],
+                    "seats_sold": sold,
+                    "total_seats": record["total_seats"],
+                })
+        else:
+            unchanged += 1
+    return changed, inserted, unchanged, oversold
+
+
+def upsert(db: Session, records: list):
+    """
+    INSERT ... ON CONFLICT (schedule key) DO UPDATE, keeping seats already sold.
+    Available seats never go below zero when capacity drops under seats sold.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        insert, greatest = postgresql.insert, func.greatest
+    elif dialect == "sqlite":
+        insert, greatest = sqlite.insert, func.max
+    else:
+        raise ScheduleImportError(f"Upserts are not supported on {dialect}")
+
+    flight = models.Flight.__table__
+    statement = insert(flight).values(records)
+    excluded = statement.excluded
+    sold_seats = flight.c.total_seats - flight.c.available_seats
+    statement = statement.on_conflict_do_update(
+        index_elements=KEY_COLUMNS,
+        set_={
+            **{name: excluded[name] for name in DIFF_COLUMNS},
+            "available_seats": greatest(excluded.total_seats - sold_seats, 0),
+            "updated_at": excluded.updated_at,
+        }
+    )
+    db.execute(statement)
+
+
+def _scope_to_airline(chunk: list, airline_code: str) -> tuple:
+    """Fill in a missing airline_code and drop rows belonging to another airline"""
+    kept = []
+    for row in chunk:
+        code = row.setdefault("airline_code", airline_code)
+        if isinstance(code, str) and code.upper() == airline_code.upper():
+            kept.append(row)
+        else:
+            logger.warning("Skipping %s: airline %s outside import scope %s", row.get("flight_number"), code, airline_code)
+    return kept, len(chunk) - len(kept)
+
+
+def import_schedule(db: Session, path: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                    airline_code: str = None, progress=None) -> dict:
+    """
+    Import a schedule file chunk by chunk; each chunk is committed on its own.
+    With airline_code, the file may omit the airline_code column and rows for
+    other airlines are rejected, so one airline's feed can't touch another's flights.
+    """
+    ensure_schedule_key(db)
+    airline_ids = {code.upper(): id for id, code in db.query(models.Airline.id, models.Airline.code)}
+
+    totals = {"rows_read": 0, "invalid": 0, "duplicates": 0, "inserted": 0, "updated": 0, "unchanged": 0}
+    oversold = []
+    started = time.perf_counter()
+
+    for chunk in chunked(read_rows(path), chunk_size):
+        unreadable = sum(1 for row in chunk if row is None)
+        chunk = [row for row in chunk if row is not None]
+        out_of_scope = 0
+        if airline_code:
+            chunk, out_of_scope = _scope_to_airline(chunk, airline_code)
+        rows, invalid = validate_chunk(chunk)
+        invalid += unreadable + out_of_scope
+        now = datetime.utcnow()
+
+        records = {}
+        unknown_airline = 0
+        for row in rows:
+            if row.airline_code.upper() not in airline_ids:
+                logger.warning("Skipping %s: unknown airline %s", row.flight_number, row.airline_code)
+                unknown_airline += 1
+                continue
+            record = _to_record(row, airline_ids, now)
+            # Later rows for the same key win (one statement can't update a row twice)
+            records[tuple(record[name] for name in KEY_COLUMNS)] = record
+
+        changed, inserted, unchanged, chunk_oversold = diff_records(db, list(records.values()))
+        for flight in chunk_oversold:
+            logger.warning(
+                "Oversold %s %s %s: %d seats sold, capacity now %d", flight["flight_number"],
+                flight["departure_date"], flight["class_type"], flight["seats_sold"], flight["total_seats"]
+            )
+        oversold += chunk_oversold
+        if changed:
+            upsert(db, changed)
+        db.commit()
+
+        totals["rows_read"] += len(chunk) + unreadable + out_of_scope
+        totals["invalid"] += invalid + unknown_airline
+        totals["duplicates"] += len(rows) - unknown_airline - len(records)
+        totals["inserted"] += inserted
+        totals["updated"] += len(changed) - inserted
+        totals["unchanged"] += unchanged
+        if progress:
+            progress(totals, time.perf_counter() - started)
+
+    elapsed = time.perf_counter() - started
+    return {
+        **totals,
+        "oversold": oversold,
+        "duration_seconds": round(elapsed, 3),
+        "rows_per_second": round(totals["rows_read"] / elapsed, 1) if elapsed else 0.0,
+    }
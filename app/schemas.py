@@ -3,8 +3,8 @@ Pydantic Schemas
 Request and response models for API validation
 """
 
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, Field, field_validator
+from typing import Optional, List, Dict
 from datetime import datetime, date, time
 from decimal import Decimal
 
@@ -91,6 +91,61 @@ class FlightResponse(FlightBase):
         from_attributes = True
 
 
+class ScheduleImportRow(FlightBase):
+    airline_code: str = Field(..., min_length=2, max_length=2)
+    total_seats: Optional[int] = Field(None, ge=0)
+    aircraft_type: Optional[str] = None
+
+
+class OversoldFlight(BaseModel):
+    """Flight whose new capacity is below the seats already sold"""
+    flight_number: str
+    departure_date: date
+    class_type: str
+    seats_sold: int
+    total_seats: int
+
+
+class ScheduleImportReport(BaseModel):
+    rows_read: int
+    invalid: int
+    duplicates: int
+    inserted: int
+    updated: int
+    unchanged: int
+    oversold: List[OversoldFlight] = []
+    duration_seconds: float
+    rows_per_second: float
+
+
+class FlightStatusUpdate(BaseModel):
+    status: str = Field(..., pattern="^(scheduled|boarding|departed|arrived|cancelled)$")
+
+
+class FlightSearchResult(BaseModel):
+    """Flight search row; only the fields requested via `fields=` are returned"""
+    id: int
+    flight_number: Optional[str] = None
+    airline_id: Optional[int] = None
+    origin: Optional[str] = None
+    destination: Optional[str] = None
+    departure_date: Optional[date] = None
+    departure_time: Optional[time] = None
+    arrival_date: Optional[date] = None
+    arrival_time: Optional[time] = None
+    duration_minutes: Optional[int] = None
+    class_type: Optional[str] = None
+    price: Optional[Decimal] = None
+    total_seats: Optional[int] = None
+    available_seats: Optional[int] = None
+    aircraft_type: Optional[str] = None
+    status: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
 # ==================== PASSENGER SCHEMAS ====================
 
 class PassengerBase(BaseModel):
@@ -179,3 +234,35 @@ class BookingStats(BaseModel):
     completed_payments: int
     pending_payments: int
     total_amount_spent: float
+
+
+# ==================== ADMIN SCHEMAS ====================
+
+class JobReport(BaseModel):
+    job: str
+    started_at: datetime
+    duration_ms: float
+    rows: Dict[str, int]
+
+
+class ProfilingSettings(BaseModel):
+    enabled: bool = False
+    slow_query_ms: float = Field(100, ge=0)
+    slow_request_ms: float = Field(500, ge=0)
+    sample_rate: float = Field(0.1, ge=0, le=1)
+    profile_dir: str
+
+
+class ProfilingSettingsUpdate(BaseModel):
+    enabled: Optional[bool] = None
+    slow_query_ms: Optional[float] = Field(None, ge=0)
+    slow_request_ms: Optional[float] = Field(None, ge=0)
+    sample_rate: Optional[float] = Field(None, ge=0, le=1)
+
+    @field_validator("enabled", "slow_query_ms", "slow_request_ms", "sample_rate")
+    @classmethod
+    def reject_null(cls, value):
+        # Fields may be omitted, but an explicit null is never a valid setting
+        if value is None:
+            raise ValueError("must not be null; omit the field to keep the current value")
+        return value
@@ -0,0 +1,325 @@
+"""
+Shared State
+Pluggable key/value, counter and token-bucket storage for caches, limiters and job leases
+
+Backends (SHARED_STATE_BACKEND):
+    memory     per-process dict; fine for a single worker
+    shm        SQLite file on /dev/shm, shared by every worker on the host
+    redis      any Redis-compatible server, shared across hosts
+    fakeredis  in-process fake Redis (fakeredis package) for local runs
+Values must be JSON-serializable; ttl is in seconds.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+SHARED_STATE_BACKEND = os.getenv("SHARED_STATE_BACKEND", "memory")  # memory, shm, redis, fakeredis
+SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH", "/dev/shm/flight-api-state.db")
+SHARED_STATE_REDIS_URL = os.getenv("SHARED_STATE_REDIS_URL", "redis://localhost:6379/0")
+
+# Backends whose state is private to each worker process
+PER_PROCESS_BACKENDS = {"memory", "fakeredis"}
+
+
+def _refill(tokens: float, updated: float, now: float, capacity: float, refill_rate: float) -> tuple:
+    """Token bucket step: (new tokens, new updated, seconds to wait or 0)"""
+    tokens = min(capacity, tokens + max(0.0, now - updated) * refill_rate)
+    if tokens >= 1:
+        return tokens - 1, now, 0
+    return tokens, now, (1 - tokens) / refill_rate
+
+
+def _bucket_ttl(capacity: float, refill_rate: float) -> float:
+    # After this long a bucket is full again, so forgetting it is lossless
+    return capacity / refill_rate + 1
+
+
+class StateBackend:
+    """Interface implemented by every backend"""
+
+    name = "base"
+    # True when calls may block (network I/O, cross-process locks); keep them off the event loop
+    blocking = False
+
+    def get(self, key: str, default=None):
+        raise NotImplementedError
+
+    def set(self, key: str, value, ttl: float = None):
+        raise NotImplementedError
+
+    def add(self, key: str, value, ttl: float = None) -> bool:
+        """Set key only if it is absent; True if it was set (usable as a lease)"""
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def incr(self, key: str, amount: int = 1, ttl: float = None) -> int:
+        """Atomically add to a counter; ttl applies when the counter is created"""
+        raise NotImplementedError
+
+    def take(self, key: str, capacity: float, refill_rate: float) -> float:
+        """Consume one token. Returns 0 if allowed, else seconds until a token is available."""
+        raise NotImplementedError
+
+
+# ==================== IN-PROCESS ====================
+
+class InProcessBackend(StateBackend):
+    name = "memory"
+
+    def __init__(self, max_keys: int = 100_000):
+        self._data = {}
+        self._lock = threading.Lock()
+        self.max_keys = max_keys
+
+    def _live(self, key: str, now: float):
+        entry = self._data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= now:
+            del self._data[key]
+            return None
+        return entry
+
+    def _store(self, key: str, value, ttl: float, now: float):
+        if key not in self._data and len(self._data) >= self.max_keys:
+            self._data = {k: e for k, e in self._data.items() if e[1] is None or e[1] > now}
+        self._data[key] = (value, now + ttl if ttl else None)
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            entry = self._live(key, time.monotonic())
+        return default if entry is None else entry[0]
+
+    def set(self, key: str, value, ttl: float = None):
+        with self._lock:
+            self._store(key, value, ttl, time.monotonic())
+
+    def add(self, key: str, value, ttl: float = None) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if self._live(key, now) is not None:
+                return False
+            self._store(key, value, ttl, now)
+            return True
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key: str, amount: int = 1, ttl: float = None) -> int:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._live(key, now)
+            if entry is None:
+                self._store(key, amount, ttl, now)
+                return amount
+            self._data[key] = (entry[0] + amount, entry[1])
+            return entry[0] + amount
+
+    def take(self, key: str, capacity: float, refill_rate: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._live(key, now)
+            tokens, updated = entry[0] if entry else (capacity, now)
+            tokens, updated, wait = _refill(tokens, updated, now, capacity, refill_rate)
+            self._store(key, (tokens, updated), _bucket_ttl(capacity, refill_rate), now)
+        return wait
+
+
+# ==================== SHARED MEMORY ====================
+
+class SharedMemoryBackend(StateBackend):
+    """
+    SQLite database on a tmpfs (/dev/shm), shared by all worker processes on the
+    host. Writes run in BEGIN IMMEDIATE transactions, so read-modify-write
+    operations are atomic across processes.
+    """
+
+    name = "shm"
+    blocking = True  # writes wait on the SQLite lock (up to 5s busy timeout)
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path: str = SHARED_STATE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        self._connect()._execute_schema()
+
+    def _connect(self):
+        # One connection per thread and per process (connections must not cross a fork)
+        if getattr(self._local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=OFF")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return self
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        return self._connect()._local.connection
+
+    def _execute_schema(self):
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+
+    def _write(self, operation):
+        """Run operation(db, now) in an immediate transaction"""
+        db = self._db
+        now = time.time()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            result = operation(db, now)
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                db.execute("DELETE FROM state WHERE expires_at <= ?", (now,))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return result
+
+    @staticmethod
+    def _read(db, key: str, now: float):
+        row = db.execute(
+            "SELECT value FROM state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)", (key, now)
+        ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    @staticmethod
+    def _put(db, key: str, value, ttl: float, now: float):
+        db.execute(
+            "INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), now + ttl if ttl else None)
+        )
+
+    def get(self, key: str, default=None):
+        value = self._read(self._db, key, time.time())
+        return default if value is None else value
+
+    def set(self, key: str, value, ttl: float = None):
+        self._write(lambda db, now: self._put(db, key, value, ttl, now))
+
+    def add(self, key: str, value, ttl: float = None) -> bool:
+        def operation(db, now):
+            if self._read(db, key, now) is not None:
+                return False
+            self._put(db, key, value, ttl, now)
+            return True
+        return self._write(operation)
+
+    def delete(self, key: str):
+        self._write(lambda db, now: db.execute("DELETE FROM state WHERE key = ?", (key,)))
+
+    def incr(self, key: str, amount: int = 1, ttl: float = None) -> int:
+        def operation(db, now):
+            row = db.execute(
+                "SELECT value, expires_at FROM state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, now)
+            ).fetchone()
+            if row is None:
+                self._put(db, key, amount, ttl, now)
+                return amount
+            value = json.loads(row[0]) + amount
+            db.execute("UPDATE state SET value = ? WHERE key = ?", (json.dumps(value), key))
+            return value
+        return self._write(operation)
+
+    def take(self, key: str, capacity: float, refill_rate: float) -> float:
+        def operation(db, now):
+            tokens, updated = self._read(db, key, now) or (capacity, now)
+            tokens, updated, wait = _refill(tokens, updated, now, capacity, refill_rate)
+            self._put(db, key, [tokens, updated], _bucket_ttl(capacity, refill_rate), now)
+            return wait
+        return self._write(operation)
+
+
+# ==================== REDIS ====================
+
+class RedisBackend(StateBackend):
+    """Works with any redis-py compatible client (redis.Redis or fakeredis.FakeRedis)"""
+
+    name = "redis"
+    blocking = True
+
+    TAKE_SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    local wait = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        wait = (1 - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return tostring(wait)
+    """
+
+    def __init__(self, client, prefix: str = "flight-api:", name: str = "redis"):
+        self.name = name
+        self._client = client
+        self._take = client.register_script(self.TAKE_SCRIPT)
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str = SHARED_STATE_REDIS_URL) -> "RedisBackend":
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("SHARED_STATE_BACKEND=redis requires the 'redis' package")
+        return cls(redis.Redis.from_url(url))
+
+    @staticmethod
+    def _ms(ttl: float):
+        return max(1, int(ttl * 1000)) if ttl else None
+
+    def get(self, key: str, default=None):
+        value = self._client.get(self.prefix + key)
+        return default if value is None else json.loads(value)
+
+    def set(self, key: str, value, ttl: float = None):
+        self._client.set(self.prefix + key, json.dumps(value), px=self._ms(ttl))
+
+    def add(self, key: str, value, ttl: float = None) -> bool:
+        return bool(self._client.set(self.prefix + key, json.dumps(value), px=self._ms(ttl), nx=True))
+
+    def delete(self, key: str):
+        self._client.delete(self.prefix + key)
+
+    def incr(self, key: str, amount: int = 1, ttl: float = None) -> int:
+        value = self._client.incrby(self.prefix + key, amount)
+        if ttl and value == amount:
+            self._client.pexpire(self.prefix + key, self._ms(ttl))
+        return value
+
+    def take(self, key: str, capacity: float, refill_rate: float) -> float:
+        wait = self._take(keys=[self.prefix + key], args=[capacity, refill_rate, time.time()])
+        return float(wait)
+
+
+def create_store(backend: str = SHARED_STATE_BACKEND) -> StateBackend:
+    if backend == "shm":
+        return SharedMemoryBackend()
+    if backend == "redis":
+        return RedisBackend.from_url()
+    if backend == "fakeredis":
+        try:
+            import fakeredis
+        except ImportError:
+            raise RuntimeError("SHARED_STATE_BACKEND=fakeredis requires the 'fakeredis[lua]' package")
+        # FakeRedis lives in this process, so it is no more shared than "memory"
+        return RedisBackend(fakeredis.FakeRedis(), name="fakeredis")
+    return InProcessBackend()
+
+
+store = create_store()
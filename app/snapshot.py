@@ -0,0 +1,353 @@
+"""
+Flight Snapshot
+Compact columnar copy of the flight catalogue, shareable between workers via a memory-mapped file
+
+Rows are sorted by (origin, destination, departure_date, departure_time) and
+packed into typed arrays: airport, airline, class, status and aircraft values
+are dictionary-encoded, dates are ordinals, times are minutes after midnight
+and prices are fixed-point (hundredths). A route/date search is a binary search
+over the packed key column followed by a scan of the matching slice.
+
+With SNAPSHOT_ENABLED=true, flight search is served from `catalogue`, rebuilt
+once it is older than SNAPSHOT_MAX_AGE_SECONDS. Seat counts may therefore lag by
+that long; bookings always re-check availability against the database.
+
+Usage:
+    python -m app.snapshot build /var/cache/flight-api/flights.snap
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time as clock
+
+from sqlalchemy.orm import Session
+
+from . import models
+
+logger = logging.getLogger("flight_api.snapshot")
+
+SNAPSHOT_ENABLED = os.getenv("SNAPSHOT_ENABLED", "false").lower() == "true"
+SNAPSHOT_MAX_AGE_SECONDS = float(os.getenv("SNAPSHOT_MAX_AGE_SECONDS", "30"))
+# Shared file workers map instead of each building their own copy (empty: build in memory)
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "")
+
+MAGIC = b"FLTSNAP2"
+EPOCH = datetime(1970, 1, 1)
+CENT = Decimal("0.01")
+
+# Column name -> array typecode
+COLUMNS = {
+    "key": "q",              # origin << 48 | destination << 32 | departure date ordinal
+    "id": "i",
+    "flight_number": "I",    # dictionary index
+    "airline": "H",          # dictionary index (airline_id, code)
+    "departure_minutes": "h",
+    "arrival_ordinal": "i",
+    "arrival_minutes": "h",
+    "duration_minutes": "i",
+    "class_type": "B",       # dictionary index
+    "price": "q",            # hundredths
+    "total_seats": "i",
+    "available_seats": "i",
+    "aircraft_type": "H",    # dictionary index (None allowed)
+    "status": "B",           # dictionary index
+    "created_at": "q",       # microseconds since the epoch, 0 if unknown
+}
+
+DICTIONARIES = ["airports", "airlines", "flight_numbers", "class_types", "aircraft_types", "statuses"]
+
+
+def _route_key(origin: int, destination: int, ordinal: int) -> int:
+    return (origin << 48) | (destination << 32) | ordinal
+
+
+def _minutes(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+class FlightSnapshot:
+    """Read-only columnar flight catalogue"""
+
+    def __init__(self, columns: dict, dictionaries: dict, built_at: str, mapping: mmap.mmap = None):
+        self.columns = columns
+        self.dictionaries = dictionaries
+        self.built_at = built_at
+        self._mapping = mapping
+        self._airport_index = {code: i for i, code in enumerate(dictionaries["airports"])}
+        self._class_index = {name: i for i, name in enumerate(dictionaries["class_types"])}
+
+    def __len__(self) -> int:
+        return len(self.columns["id"])
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the column data (excluding the small dictionaries)"""
+        return sum(column.itemsize * len(column) for column in self.columns.values())
+
+    # ==================== BUILD ====================
+
+    @classmethod
+    def build(cls, db: Session) -> "FlightSnapshot":
+        """Load every flight with one bulk query and pack it into columns"""
+        flight = models.Flight
+        airlines = {row.id: row.code for row in db.query(models.Airline.id, models.Airline.code)}
+        rows = db.query(
+            flight.id, flight.flight_number, flight.airline_id, flight.origin, flight.destination,
+            flight.departure_date, flight.departure_time, flight.arrival_date, flight.arrival_time,
+            flight.duration_minutes, flight.class_type, flight.price, flight.total_seats,
+            flight.available_seats, flight.aircraft_type, flight.status, flight.created_at
+        ).yield_per(10000)
+
+        dictionaries = {name: [] for name in DICTIONARIES}
+        indexes = {name: {} for name in DICTIONARIES}
+
+        def encode(name, value):
+            index = indexes[name].get(value)
+            if index is None:
+                index = indexes[name][value] = len(dictionaries[name])
+                dictionaries[name].append(value)
+            return index
+
+        packed = []
+        for row in rows:
+            packed.append((
+                (row.origin, row.destination, row.departure_date.toordinal(), _minutes(row.departure_time), row.id),
+                (
+                    row.id,
+                    encode("flight_numbers", row.flight_number),
+                    encode("airlines", (row.airline_id, airlines.get(row.airline_id))),
+                    _minutes(row.departure_time),
+                    row.arrival_date.toordinal(),
+                    _minutes(row.arrival_time),
+                    row.duration_minutes,
+                    encode("class_types", row.class_type),
+                    int(row.price * 100),
+                    row.total_seats,
+                    row.available_seats,
+                    encode("aircraft_types", row.aircraft_type),
+                    encode("statuses", row.status or "scheduled"),
+                    (row.created_at - EPOCH) // timedelta(microseconds=1) if row.created_at else 0,
+                ),
+            ))
+            encode("airports", row.origin)
+            encode("airports", row.destination)
+        packed.sort(key=lambda item: item[0])
+
+        # Re-number airports alphabetically so key order matches (origin, destination) order
+        dictionaries["airports"].sort()
+        airport_index = {code: i for i, code in enumerate(dictionaries["airports"])}
+
+        columns = {name: array(typecode) for name, typecode in COLUMNS.items()}
+        value_columns = [name for name in COLUMNS if name != "key"]
+        for (origin, destination, ordinal, _, _), values in packed:
+            columns["key"].append(_route_key(airport_index[origin], airport_index[destination], ordinal))
+            for name, value in zip(value_columns, values):
+                columns[name].append(value)
+
+        return cls(columns, dictionaries, datetime.utcnow().isoformat())
+
+    # ==================== FILE FORMAT ====================
+
+    def save(self, path: str):
+        """Write the snapshot atomically (magic, header length, JSON header, 8-byte aligned columns)"""
+        layout = []
+        offset = 0
+        for name, column in self.columns.items():
+            length = column.itemsize * len(column)
+            layout.append({"name": name, "typecode": column.typecode, "offset": offset, "length": length})
+            offset += (length + 7) // 8 * 8
+
+        header = json.dumps({
+            "count": len(self),
+            "built_at": self.built_at,
+            "dictionaries": self.dictionaries,
+            "columns": layout,
+        }).encode()
+        data_start = (len(MAGIC) + 4 + len(header) + 7) // 8 * 8
+
+        # A temp file of our own: workers rebuilding a stale snapshot at once must not share one
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        try:
+            os.fchmod(fd, 0o644)
+            with os.fdopen(fd, "wb") as f:
+                f.write(MAGIC + struct.pack("<I", len(header)) + header)
+                f.write(b"\0" * (data_start - f.tell()))
+                for entry, column in zip(layout, self.columns.values()):
+                    f.seek(data_start + entry["offset"])
+                    f.write(column.tobytes())
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> "FlightSnapshot":
+        """Memory-map a snapshot file; workers mapping the same file share its pages"""
+        with open(path, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mapping[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a flight snapshot")
+        (header_length,) = struct.unpack_from("<I", mapping, len(MAGIC))
+        header_start = len(MAGIC) + 4
+        header = json.loads(mapping[header_start:header_start + header_length])
+        data_start = (header_start + header_length + 7) // 8 * 8
+
+        view = memoryview(mapping)
+        columns = {
+            entry["name"]: view[data_start + entry["offset"]:data_start + entry["offset"] + entry["length"]].cast(entry["typecode"])
+            for entry in header["columns"]
+        }
+        dictionaries = header["dictionaries"]
+        dictionaries["airlines"] = [tuple(airline) for airline in dictionaries["airlines"]]
+        return cls(columns, dictionaries, header["built_at"], mapping)
+
+    # ==================== QUERIES ====================
+
+    def search(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: date,
+        passengers: int = 1,
+        class_type: str = None,
+        airline_id: int = None,
+        departure_after: time = None,
+        departure_before: time = None,
+        max_price: Decimal = None,
+        max_duration: int = None,
+    ) -> list:
+        """Row positions matching the search, in departure time order"""
+        origin_index = self._airport_index.get(origin.upper())
+        destination_index = self._airport_index.get(destination.upper())
+        if origin_index is None or destination_index is None:
+            return []
+        if class_type is not None and class_type not in self._class_index:
+            return []
+
+        key = _route_key(origin_index, destination_index, departure_date.toordinal())
+        keys = self.columns["key"]
+        start, end = bisect_left(keys, key), bisect_right(keys, key)
+
+        c = self.columns
+        class_index = self._class_index.get(class_type)
+        after = _minutes(departure_after) if departure_after else None
+        before = _minutes(departure_before) if departure_before else None
+        price_limit = int(max_price * 100) if max_price is not None else None
+        airlines = self.dictionaries["airlines"]
+
+        return [
+            i for i in range(start, end)
+            if c["available_seats"][i] >= passengers
+            and (class_index is None or c["class_type"][i] == class_index)
+            and (airline_id is None or airlines[c["airline"][i]][0] == airline_id)
+            and (after is None or c["departure_minutes"][i] >= after)
+            and (before is None or c["departure_minutes"][i] <= before)
+            and (price_limit is None or c["price"][i] <= price_limit)
+            and (max_duration is None or c["duration_minutes"][i] <= max_duration)
+        ]
+
+    def row(self, i: int) -> dict:
+        """Decode one row into FlightResponse-style fields"""
+        c = self.columns
+        d = self.dictionaries
+        key = c["key"][i]
+        airline_id, _ = d["airlines"][c["airline"][i]]
+        departure = c["departure_minutes"][i]
+        arrival = c["arrival_minutes"][i]
+        return {
+            "id": c["id"][i],
+            "flight_number": d["flight_numbers"][c["flight_number"][i]],
+            "airline_id": airline_id,
+            "origin": d["airports"][key >> 48],
+            "destination": d["airports"][(key >> 32) & 0xFFFF],
+            "departure_date": date.fromordinal(key & 0xFFFFFFFF),
+            "departure_time": time(departure // 60, departure % 60),
+            "arrival_date": date.fromordinal(c["arrival_ordinal"][i]),
+            "arrival_time": time(arrival // 60, arrival % 60),
+            "duration_minutes": c["duration_minutes"][i],
+            "class_type": d["class_types"][c["class_type"][i]],
+            "price": (Decimal(c["price"][i]) / 100).quantize(CENT),
+            "total_seats": c["total_seats"][i],
+            "available_seats": c["available_seats"][i],
+            "aircraft_type": d["aircraft_types"][c["aircraft_type"][i]],
+            "status": d["statuses"][c["status"][i]],
+            "created_at": EPOCH + timedelta(microseconds=c["created_at"][i]) if c["created_at"][i] else None,
+        }
+
+
+class SnapshotCache:
+    """
+    The snapshot searches are served from, refreshed once older than max_age.
+    With a path, a worker finding a fresh file maps it instead of rebuilding,
+    so workers share one build and one copy of the pages.
+    """
+
+    def __init__(self, path: str = SNAPSHOT_PATH, max_age: float = SNAPSHOT_MAX_AGE_SECONDS):
+        self.path = path
+        self.max_age = max_age
+        self.snapshot = None
+        self.loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def _stale(self) -> bool:
+        return self.snapshot is None or clock.monotonic() - self.loaded_at >= self.max_age
+
+    def _refresh(self, db: Session) -> FlightSnapshot:
+        if self.path:
+            try:
+                if clock.time() - os.path.getmtime(self.path) < self.max_age:
+                    return FlightSnapshot.load(self.path)
+            except (OSError, ValueError):
+                pass  # missing or unreadable: rebuild it
+        snapshot = FlightSnapshot.build(db)
+        if self.path:
+            try:
+                snapshot.save(self.path)
+            except OSError:
+                # Other workers rebuild for themselves; this one serves its in-memory build
+                logger.exception("Could not save flight snapshot to %s", self.path)
+        return snapshot
+
+    def get(self, db: Session) -> FlightSnapshot:
+        if self._stale():
+            with self._lock:
+                if self._stale():
+                    self.snapshot = self._refresh(db)
+                    self.loaded_at = clock.monotonic()
+        return self.snapshot
+
+
+catalogue = SnapshotCache()
+
+
+def main():
+    if len(sys.argv) != 3 or sys.argv[1] != "build":
+        print("Usage: python -m app.snapshot build <path>")
+        sys.exit(1)
+
+    from . import database
+
+    db = database.SessionLocal()
+    try:
+        snapshot = FlightSnapshot.build(db)
+    finally:
+        db.close()
+    snapshot.save(sys.argv[2])
+    print(f"✅ Wrote {len(snapshot)} flights ({snapshot.nbytes / 1024:.1f} KiB of columns) to {sys.argv[2]}")
+
+
+if __name__ == "__main__":
+    main()
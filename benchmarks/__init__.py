@@ -0,0 +1,4 @@
+"""
+Benchmarks
+Load-testing harness for the Flight Booking API
+"""
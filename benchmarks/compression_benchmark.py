@@ -0,0 +1,105 @@
+"""
+Compression Benchmark
+Bytes-on-wire versus CPU time for gzip/brotli on typical FlightResponse lists
+
+Usage (from the repository root):
+    python -m benchmarks.compression_benchmark --output compression.json
+"""
+
+import argparse
+import gzip
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.api_benchmark import git_commit, seed_database
+
+SIZES = [10, 100, 500]
+GZIP_LEVELS = [1, 6, 9]
+BROTLI_QUALITIES = [1, 4, 11]
+
+
+def payloads(database_url: str, seed: int) -> dict:
+    """Serialized FlightResponse lists of each size, as the API would send them"""
+    seed_database(database_url, seed)
+
+    from fastapi.encoders import jsonable_encoder
+    from app import database, models, schemas
+
+    db = database.SessionLocal()
+    try:
+        flights = db.query(models.Flight).order_by(models.Flight.id).limit(max(SIZES)).all()
+        return {
+            size: json.dumps(jsonable_encoder(
+                [schemas.FlightResponse.model_validate(flight) for flight in flights[:size]]
+            )).encode()
+            for size in SIZES
+        }
+    finally:
+        db.close()
+
+
+def timed(func, repeat: int) -> tuple:
+    """Median microseconds per call and the last result"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - started) * 1_000_000)
+    return statistics.median(samples), result
+
+
+def codecs() -> list:
+    entries = [
+        (f"gzip-{level}", lambda body, level=level: gzip.compress(body, compresslevel=level, mtime=0), gzip.decompress)
+        for level in GZIP_LEVELS
+    ]
+    try:
+        import brotli
+    except ImportError:
+        return entries
+    entries += [
+        (f"br-{quality}", lambda body, quality=quality: brotli.compress(body, quality=quality), brotli.decompress)
+        for quality in BROTLI_QUALITIES
+    ]
+    return entries
+
+
+def run(args) -> dict:
+    results = {}
+    for size, body in payloads(args.database_url, args.seed).items():
+        rows = {"identity": {"bytes": len(body), "ratio": 1.0, "compress_us": 0.0, "decompress_us": 0.0}}
+        for name, compress, decompress in codecs():
+            compress_us, compressed = timed(lambda: compress(body), args.repeat)
+            decompress_us, _ = timed(lambda: decompress(compressed), args.repeat)
+            rows[name] = {
+                "bytes": len(compressed),
+                "ratio": round(len(body) / len(compressed), 2),
+                "compress_us": round(compress_us, 1),
+                "decompress_us": round(decompress_us, 1),
+            }
+        results[f"{size}_flights"] = rows
+    return {"meta": {"commit": git_commit(), "seed": args.seed, "repeat": args.repeat}, "payloads": results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Response compression benchmark")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", default=None, help="Defaults to a temporary SQLite file")
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+    if not args.database_url:
+        args.database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+    report = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Gunicorn Configuration
+Production runtime: uvicorn workers sized from the CPUs available to the container
+
+Usage:
+    gunicorn app.main:app -c gunicorn.conf.py
+"""
+
+import os
+
+
+def cpu_count() -> int:
+    """CPUs this process may use, honouring cgroup v2 CPU quotas (docker --cpus)"""
+    count = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            count = min(count, max(1, -(-int(quota) // int(period))))
+    except (OSError, ValueError):
+        pass
+    return count
+
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Each worker holds its own DB pool (DB_POOL_SIZE + DB_MAX_OVERFLOW connections),
+# so the cap keeps workers x pool under the database's max_connections
+workers = int(os.getenv("WEB_CONCURRENCY", min(2 * cpu_count() + 1, int(os.getenv("MAX_WORKERS", "8")))))
+
+timeout = int(os.getenv("WORKER_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+
+# Recycle workers periodically to bound memory growth
+max_requests = int(os.getenv("MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "1000"))
+
+# Workers import the app themselves, so each builds its own connection pools
+preload_app = False
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info")
+
+# Caches, rate limits and job leases must be shared by the workers, and so must
+# inventory events (the postgres broker needs a PostgreSQL DATABASE_URL)
+os.environ.setdefault("SHARED_STATE_BACKEND", "shm")
+os.environ.setdefault("EVENTS_BACKEND", "postgres")
+
+
+def _reset_shared_state():
+    if os.environ["SHARED_STATE_BACKEND"] != "shm":
+        return
+    path = os.getenv("SHARED_STATE_PATH", "/dev/shm/flight-api-state.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def on_starting(server):
+    """
+    Runs once in the master before any worker starts: create the schema (workers
+    would otherwise race on DDL against a fresh database), start with empty
+    shared state and tell the app how many workers share it.
+    """
+    from app import database, models
+
+    models.create_schema(database.engine)
+    # Workers inherit this module after fork; they must not inherit open connections
+    database.engine.dispose()
+
+    _reset_shared_state()
+    os.environ["CREATE_SCHEMA_ON_STARTUP"] = "false"
+    os.environ["WEB_WORKERS"] = str(server.cfg.workers)
@@ -0,0 +1,62 @@
+"""
+Import Airline Schedules
+Streams a CSV/NDJSON schedule file into the flights table with upserts
+
+Usage:
+    python import_schedule.py schedules/p4-2026-02.csv --airline P4
+    python import_schedule.py schedules/all.ndjson.gz --chunk-size 2000
+
+Rows follow FlightBase (flight_number, origin, destination, departure_date,
+departure_time, arrival_date, arrival_time, duration_minutes, class_type,
+price, available_seats) plus airline_code and optional total_seats/aircraft_type.
+"""
+
+import argparse
+import logging
+import sys
+
+from app import models, database, schemas, schedule_import
+
+
+def print_progress(totals: dict, elapsed: float):
+    rate = totals["rows_read"] / elapsed if elapsed else 0
+    print(
+        f"   ... {totals['rows_read']} rows ({totals['inserted']} new, {totals['updated']} updated, "
+        f"{totals['invalid']} invalid) {rate:,.0f} rows/s",
+        file=sys.stderr
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import an airline schedule file")
+    parser.add_argument("path", help=".csv or .ndjson/.jsonl, optionally .gz")
+    parser.add_argument("--airline", default=None, help="Airline code the file belongs to")
+    parser.add_argument("--chunk-size", type=int, default=schedule_import.DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    print(f"🛫 Importing {args.path}...", file=sys.stderr)
+
+    models.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    try:
+        report = schedule_import.import_schedule(
+            db, args.path, chunk_size=args.chunk_size, airline_code=args.airline, progress=print_progress
+        )
+    except schedule_import.ScheduleImportError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        db.close()
+
+    for flight in report["oversold"]:
+        print(
+            f"⚠️  Oversold {flight['flight_number']} {flight['departure_date']} {flight['class_type']}: "
+            f"{flight['seats_sold']} seats sold, capacity now {flight['total_seats']}",
+            file=sys.stderr
+        )
+    print(schemas.ScheduleImportReport(**report).model_dump_json(indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Partition Maintenance
+Converts flights/bookings to monthly partitions and keeps the active window small
+
+Usage:
+    python manage_partitions.py convert              # one-off, existing PostgreSQL database
+    python manage_partitions.py maintain             # daily: create future months, archive old ones
+    python manage_partitions.py maintain --archive-dir /backups/partitions --months-ahead 6
+"""
+
+import argparse
+import sys
+
+from app import database, partitions
+
+
+def convert(args):
+    """Convert existing tables to partitioned tables"""
+    for table in partitions.PARTITIONED_TABLES:
+        if partitions.convert_table(database.engine, table, months_ahead=args.months_ahead):
+            print(f"✅ Converted {table} to monthly partitions")
+            for constraint in partitions.PARTITIONED_TABLES[table].get("dropped_constraints", []):
+                print(f"⚠️  {table}: dropped {constraint}")
+        else:
+            print(f"⚠️  {table} is already partitioned. Skipping...")
+
+
+def maintain(args):
+    """Create upcoming partitions and archive expired ones"""
+    for table in partitions.PARTITIONED_TABLES:
+        created = partitions.ensure_future_partitions(database.engine, table, months_ahead=args.months_ahead)
+        print(f"✅ {table}: created {len(created)} partition(s) {', '.join(created)}")
+
+        archived, referenced = partitions.archive_partitions(database.engine, table, args.archive_dir)
+        for path in archived:
+            print(f"📦 {table}: archived to {path}")
+        for name in referenced:
+            print(f"⏳ {table}: kept {name}, still referenced by retained rows")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flight Booking API partition maintenance")
+    parser.add_argument("command", choices=["convert", "maintain"])
+    parser.add_argument("--months-ahead", type=int, default=3, help="Future monthly partitions to keep ready")
+    parser.add_argument("--archive-dir", default="archive", help="Where expired partitions are written")
+    args = parser.parse_args()
+
+    try:
+        {"convert": convert, "maintain": maintain}[args.command](args)
+    except partitions.PartitioningError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""
+User Administration
+Grants and revokes admin rights; admins can't be created through the public API
+
+Usage:
+    python manage_users.py grant-admin alice
+    python manage_users.py revoke-admin alice
+"""
+
+import argparse
+import sys
+
+from app import models, database
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flight Booking API user administration")
+    parser.add_argument("command", choices=["grant-admin", "revoke-admin"])
+    parser.add_argument("username")
+    args = parser.parse_args()
+
+    db = database.SessionLocal()
+    try:
+        user = db.query(models.User).filter(models.User.username == args.username).first()
+        if user is None:
+            print(f"❌ User '{args.username}' not found")
+            sys.exit(1)
+        user.is_admin = args.command == "grant-admin"
+        db.commit()
+        print(f"✅ {args.username}: admin {'granted' if user.is_admin else 'revoked'}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -87,6 +87,7 @@ def seed_flights(db: Session):
     # Generate flights for next 30 days
     for day_offset in range(30):
         flight_date = date.today() + timedelta(days=day_offset)
+        used_flight_numbers = set()  # (flight_number, class_type) is unique per day
         
         for origin, destination in routes:
             # 3-5 flights per route per day
@@ -138,6 +139,9 @@ def seed_flights(db: Session):
                 
                 # Flight number
                 flight_number = f"{airline.code}{random.randint(100, 999)}"
+                while (flight_number, class_type) in used_flight_numbers:
+                    flight_number = f"{airline.code}{random.randint(100, 999)}"
+                used_flight_numbers.add((flight_number, class_type))
                 
                 flight = models.Flight(
                     flight_number=flight_number,
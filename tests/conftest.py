@@ -0,0 +1,10 @@
+"""
+Test Configuration
+Points the app at SQLite before any app module creates its engine
+"""
+
+import os
+import tempfile
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
+os.environ.setdefault("JOBS_ENABLED", "false")
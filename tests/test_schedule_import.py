@@ -0,0 +1,133 @@
+"""
+Schedule Import Tests
+Diff counts and seat handling of app.schedule_import against SQLite
+"""
+
+import csv
+import json
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models, schedule_import
+
+COLUMNS = [
+    "airline_code", "flight_number", "origin", "destination", "departure_date", "departure_time",
+    "arrival_date", "arrival_time", "duration_minutes", "class_type", "price", "available_seats", "total_seats",
+]
+
+
+def schedule_row(flight_number="AJ100", price="50000", total_seats="30", **overrides):
+    row = {
+        "airline_code": "AJ", "flight_number": flight_number, "origin": "LOS", "destination": "ABV",
+        "departure_date": "2026-12-01", "departure_time": "08:00", "arrival_date": "2026-12-01",
+        "arrival_time": "09:10", "duration_minutes": "70", "class_type": "economy",
+        "price": price, "available_seats": total_seats, "total_seats": total_seats,
+    }
+    row.update(overrides)
+    return row
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'import.db'}")
+    models.Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(models.Airline(code="AJ", name="Arik Air", country="Nigeria"))
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def write_schedule(tmp_path):
+    def write(rows, name="schedule.csv"):
+        path = tmp_path / name
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=COLUMNS)
+            writer.writeheader()
+            writer.writerows(rows)
+        return str(path)
+    return write
+
+
+@pytest.fixture
+def write_ndjson(tmp_path):
+    def write(lines, name="schedule.ndjson"):
+        path = tmp_path / name
+        path.write_text("".join(line + "\n" for line in lines))
+        return str(path)
+    return write
+
+
+def flight(db, flight_number):
+    db.expire_all()
+    return db.query(models.Flight).filter(models.Flight.flight_number == flight_number).one()
+
+
+def test_counts_inserted_updated_unchanged(db, write_schedule):
+    rows = [
+        schedule_row("AJ100"),
+        schedule_row("AJ101"),
+        schedule_row("AJ101", price="60000"),      # duplicate key: the later row wins
+        schedule_row("AJ102", class_type="bogus"),  # invalid
+    ]
+    report = schedule_import.import_schedule(db, write_schedule(rows))
+    assert report["rows_read"] == 4
+    assert report["invalid"] == 1
+    assert report["duplicates"] == 1
+    assert (report["inserted"], report["updated"], report["unchanged"]) == (2, 0, 0)
+    assert flight(db, "AJ101").price == 60000
+
+    report = schedule_import.import_schedule(db, write_schedule(rows))
+    assert (report["inserted"], report["updated"], report["unchanged"]) == (0, 0, 2)
+
+    changed = [schedule_row("AJ100", price="55000"), schedule_row("AJ101", price="60000")]
+    report = schedule_import.import_schedule(db, write_schedule(changed))
+    assert (report["inserted"], report["updated"], report["unchanged"]) == (0, 1, 1)
+    assert flight(db, "AJ100").price == 55000
+
+
+def test_capacity_change_keeps_sold_seats(db, write_schedule):
+    schedule_import.import_schedule(db, write_schedule([schedule_row(total_seats="30")]))
+    flight(db, "AJ100").available_seats = 10  # 20 seats sold
+    db.commit()
+
+    report = schedule_import.import_schedule(db, write_schedule([schedule_row(total_seats="40")]))
+    assert report["updated"] == 1
+    assert report["oversold"] == []
+    assert (flight(db, "AJ100").total_seats, flight(db, "AJ100").available_seats) == (40, 20)
+
+
+def test_capacity_below_sold_seats_is_clamped_and_reported(db, write_schedule):
+    schedule_import.import_schedule(db, write_schedule([schedule_row(total_seats="30")]))
+    flight(db, "AJ100").available_seats = 10  # 20 seats sold
+    db.commit()
+
+    report = schedule_import.import_schedule(db, write_schedule([schedule_row(total_seats="5")]))
+    assert flight(db, "AJ100").available_seats == 0
+    assert len(report["oversold"]) == 1
+    assert report["oversold"][0]["seats_sold"] == 20
+    assert report["oversold"][0]["total_seats"] == 5
+
+
+def test_airline_scope_rejects_other_airlines(db, write_schedule):
+    rows = [schedule_row("AJ100"), schedule_row("P4100", airline_code="P4")]
+    report = schedule_import.import_schedule(db, write_schedule(rows), airline_code="AJ")
+    assert report["inserted"] == 1
+    assert report["invalid"] == 1
+
+
+def test_malformed_ndjson_lines_are_invalid(db, write_ndjson):
+    lines = [
+        json.dumps(schedule_row("AJ100")),
+        '{"flight_number": "AJ101", ',  # truncated
+        json.dumps(["not", "an", "object"]),
+        json.dumps(schedule_row("AJ102")),
+    ]
+    report = schedule_import.import_schedule(db, write_ndjson(lines), chunk_size=2, airline_code="AJ")
+    assert report["rows_read"] == 4
+    assert report["invalid"] == 2
+    assert report["inserted"] == 2